@@ -0,0 +1,92 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from collector import collect_gw, get_played_gws, load_lookups, read_player_gws
+
+
+def backfill_season(season, gws, data_dir='data', output_dir=None):
+    """ Rebuild gwN.csv for the given gameweeks of a season in a single pass
+
+    Lookups are loaded once and every player's gw.csv is read once, then the
+    rows are grouped by gameweek and handed to collect_gw.
+
+    Args:
+        season (str): Name of the season folder, e.g. '2019-20'
+        gws (list): Gameweeks to rebuild, every played gameweek when None
+        data_dir (str): Folder containing the season folders
+        output_dir (str): Folder to write to, the season's gws folder when None
+    """
+    root_directory_name = os.path.join(data_dir, season)
+    players_dir = os.path.join(root_directory_name, 'players')
+    xp_directory = os.path.join(root_directory_name, 'gws')
+    if output_dir is None:
+        output_dir = xp_directory
+    os.makedirs(output_dir, exist_ok=True)
+    players = read_player_gws(players_dir)
+    lookups = load_lookups(root_directory_name, players)
+    played = get_played_gws(root_directory_name, players)
+    gws = played if gws is None else [gw for gw in gws if gw in played]
+
+    players_by_gw = {gw: [] for gw in gws}
+    for id, fieldnames, rows in players:
+        player_rows = {}
+        for row in rows:
+            gw = int(row['round'])
+            if gw in players_by_gw:
+                player_rows.setdefault(gw, []).append(row)
+        for gw, gw_rows in player_rows.items():
+            players_by_gw[gw] += [(id, fieldnames, gw_rows)]
+    for gw in gws:
+        collect_gw(gw, players_dir, output_dir, root_directory_name, players=players_by_gw[gw],
+                   lookups=lookups, xp_directory=xp_directory)
+    return season, len(gws)
+
+
+def parse_gw_range(gw_range):
+    """ Gameweeks of a range like '1-10' or '5', None for every played gameweek
+    """
+    if gw_range is None:
+        return None
+    if '-' in gw_range:
+        start, end = gw_range.split('-')
+        return list(range(int(start), int(end) + 1))
+    return [int(gw_range)]
+
+
+def backfill(seasons, data_dir='data', workers=None, output_base=None):
+    """ Rebuild the gameweek files of many seasons in parallel, one season per worker
+
+    Args:
+        seasons (list): (season, gameweek range or None) pairs, e.g. [('2019-20', '1-10')]
+        data_dir (str): Folder containing the season folders
+        workers (int): Number of processes, one per CPU when None
+        output_base (str): Folder to write each season's gameweeks under, the
+            season's own gws folder when None
+    """
+    tasks = []
+    for season, gw_range in seasons:
+        gws = parse_gw_range(gw_range)
+        output_dir = None if output_base is None else os.path.join(output_base, season)
+        tasks += [(season, gws, data_dir, output_dir)]
+    with ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(backfill_season, *task) for task in tasks]
+        for future in futures:
+            season, num_gws = future.result()
+            print("Collected " + str(num_gws) + " gameweeks of " + season)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python backfill.py <season>[:<gw_range>] [...]. Eg: python backfill.py 2016-17 2019-20:1-10 2024-25:3")
+        sys.exit(1)
+    seasons = []
+    for arg in sys.argv[1:]:
+        season, _, gw_range = arg.partition(':')
+        seasons += [(season, gw_range or None)]
+    start = time.time()
+    backfill(seasons)
+    print("Done in " + str(round(time.time() - start, 1)) + "s")
+
+if __name__ == '__main__':
+    main()
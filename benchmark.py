@@ -0,0 +1,319 @@
+import csv
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from season_loader import detect_encoding
+
+# Season the collector and the players parser run on
+COLLECT_SEASON = '2024-25'
+COLLECT_GW = 1
+# Season, player and new position the position checker runs on
+POSITION_SEASON = '2021-22'
+POSITION_PLAYER = 233
+POSITION_NEW = 'FWD'
+# Added to the element ids of every synthetic copy of a player
+ELEMENT_OFFSET = 10000
+# Added to the FPL codes of every synthetic copy, above every real code
+CODE_OFFSET = 10000000
+# Fraction over the baseline a case may take before it is flagged
+TIME_TOLERANCE = 0.25
+MEMORY_TOLERANCE = 0.25
+CASES = ['collect_gw', 'merge_data', 'parse_players', 'recalculate_total_points']
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+_opened = set()
+_auditing = False
+
+
+def audit_open(event, args):
+    if _auditing and event == 'open' and isinstance(args[0], (str, bytes)):
+        _opened.add(os.path.realpath(args[0]))
+
+
+def get_benchmark_dir():
+    """ Folder of the results, outside of the data folder so they are not part of its manifest
+
+    Only baseline.json is tracked; history.json grows with every run and stays local.
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks')
+
+
+def get_history_path():
+    return os.path.join(get_benchmark_dir(), 'history.json')
+
+
+def get_baseline_path():
+    return os.path.join(get_benchmark_dir(), 'baseline.json')
+
+
+def copy_rows(src, dst, copies, offsets):
+    """ Write the rows of a csv once per copy, with the ids of copy k moved by k times their offset
+
+    Args:
+        src (str): File to copy
+        dst (str): File to write
+        copies (list): Number of every copy, copy 0 keeps the original ids
+        offsets (dict): Id column -> offset, e.g. {'element': ELEMENT_OFFSET}
+    """
+    encoding = detect_encoding(src)
+    with open(src, 'r', encoding=encoding) as fin:
+        reader = csv.DictReader(fin)
+        fieldnames = reader.fieldnames
+        rows = list(reader)
+    with open(dst, 'w', encoding=encoding, newline='') as outf:
+        writer = csv.DictWriter(outf, fieldnames=fieldnames, lineterminator='\n')
+        writer.writeheader()
+        for k in copies:
+            for row in rows:
+                if k > 0:
+                    row = dict(row)
+                    for column, offset in offsets.items():
+                        if column in row and row[column].isdigit():
+                            row[column] = str(int(row[column]) + k * offset)
+                writer.writerow(row)
+
+
+def scale_season(src, dst, scale, players=False):
+    """ Copy of a season folder with `scale` copies of every player
+
+    Files the benchmarks do not scale are symlinked. Copies of a player get
+    new element ids and FPL codes, so they stay distinct players everywhere,
+    including in the identity table.
+
+    Args:
+        src (str): Season folder to copy
+        dst (str): Folder to create
+        scale (int): Number of copies of every player
+        players (bool): Also scale the players folder
+    """
+    os.makedirs(dst)
+    for entry in os.listdir(src):
+        path = os.path.join(src, entry)
+        if entry == 'gws':
+            os.makedirs(os.path.join(dst, entry))
+            for fname in os.listdir(path):
+                id_column = 'id' if fname.startswith('xP') else 'element'
+                copy_rows(os.path.join(path, fname), os.path.join(dst, entry, fname), range(scale),
+                          {id_column: ELEMENT_OFFSET})
+        elif entry == 'players_raw.csv':
+            copy_rows(path, os.path.join(dst, entry), range(scale), {'id': ELEMENT_OFFSET, 'code': CODE_OFFSET})
+        elif players and entry == 'players':
+            for folder in os.listdir(path):
+                name, _, id = folder.rpartition('_')
+                for k in range(scale):
+                    copy = os.path.join(dst, entry, name + '_' + str(int(id) + k * ELEMENT_OFFSET))
+                    os.makedirs(copy)
+                    for fname in os.listdir(os.path.join(path, folder)):
+                        copy_rows(os.path.join(path, folder, fname), os.path.join(copy, fname), [k],
+                                  {'element': ELEMENT_OFFSET})
+        else:
+            os.symlink(path, os.path.join(dst, entry))
+
+
+def make_workspace(workspace, scale, data_dir='data'):
+    """ Build a data folder for the benchmarks to run against
+
+    At scale 1 every season is a symlink to the committed data, so nothing is
+    copied and the outputs of the benchmarks stay out of the repo. The
+    identity table is not linked, it is built in the workspace.
+
+    Args:
+        workspace (str): Empty folder to build the data folder in
+        scale (int): Number of copies of every player
+        data_dir (str): Folder containing the season folders
+    """
+    src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), data_dir)
+    dst_dir = os.path.join(workspace, data_dir)
+    os.makedirs(dst_dir)
+    for entry in os.listdir(src_dir):
+        path = os.path.join(src_dir, entry)
+        if entry in ['player_identity.csv', 'cleaned_merged_seasons.csv']:
+            continue
+        if scale > 1 and os.path.isdir(os.path.join(path, 'gws')):
+            scale_season(path, os.path.join(dst_dir, entry), scale, players=entry == COLLECT_SEASON)
+        else:
+            os.symlink(path, os.path.join(dst_dir, entry))
+    os.makedirs(os.path.join(workspace, 'output'))
+
+
+def get_case(name, workspace):
+    """ Function running a benchmark case, with its inputs prepared outside of it
+    """
+    season_dir = os.path.join('data', COLLECT_SEASON)
+    output_dir = os.path.join(workspace, 'output')
+    if name == 'collect_gw':
+        from collector import collect_gw
+        xp_path = os.path.join(season_dir, 'gws', 'xP' + str(COLLECT_GW) + '.csv')
+        if os.path.exists(xp_path):
+            shutil.copy(xp_path, output_dir)
+        return lambda: collect_gw(COLLECT_GW, os.path.join(season_dir, 'players'), output_dir, season_dir)
+    if name == 'merge_data':
+        from global_merger import merge_data
+        from player_identity import build_identity_table
+        build_identity_table()
+        return merge_data
+    if name == 'parse_players':
+        from parsers import parse_players
+        with open(os.path.join(season_dir, 'players_raw.csv'), 'r', encoding='utf-8') as fin:
+            players = list(csv.DictReader(fin))
+        return lambda: parse_players(players, output_dir + os.sep)
+    if name == 'recalculate_total_points':
+        from new_position_checker import recalculateTotalPoints
+        return lambda: recalculateTotalPoints(POSITION_SEASON, POSITION_PLAYER, POSITION_NEW)
+    raise Exception("Unknown benchmark case " + name)
+
+
+def run_case(name, workspace, mode):
+    """ Run a case once in this process, from the workspace
+
+    Timed runs measure the wall time alone; traced runs measure the peak
+    memory with tracemalloc and the files opened with an audit hook, which
+    both slow the run down.
+
+    Args:
+        name (str): Name of the case, one of CASES
+        workspace (str): Folder built by make_workspace
+        mode (str): 'time' or 'trace'
+    """
+    global _auditing
+    # the modules stay importable once the working directory changes
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(workspace)
+    case = get_case(name, workspace)
+    if mode == 'time':
+        start = time.perf_counter()
+        case()
+        return {'time': time.perf_counter() - start}
+    sys.addaudithook(audit_open)
+    tracemalloc.start()
+    _auditing = True
+    case()
+    _auditing = False
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'peak_mb': peak / 2 ** 20, 'files': len(_opened)}
+
+
+def measure(name, workspace, repeat=3):
+    """ Best wall time over `repeat` runs, peak memory and files opened of a case
+
+    Every run is a fresh interpreter, so no run warms the caches of the next.
+    """
+    def run(mode):
+        code = ('import json, benchmark; print(json.dumps(benchmark.run_case('
+                + repr(name) + ', ' + repr(workspace) + ', ' + repr(mode) + ')))')
+        out = subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.PIPE, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        return json.loads(out.strip().splitlines()[-1])
+    result = {'time': min(run('time')['time'] for _ in range(repeat))}
+    result.update(run('trace'))
+    return result
+
+
+def load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r') as fin:
+        return json.load(fin)
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as outf:
+        json.dump(data, outf, indent=2)
+
+
+def get_commit():
+    out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    return out.stdout.strip() or None
+
+
+def find_regressions(cases, baseline):
+    """ Descriptions of every metric of a run that is worse than the baseline allows
+
+    Args:
+        cases (dict): Case -> metrics of the run
+        baseline (dict): Case -> metrics of the baseline at the same scale
+    """
+    regressions = []
+    for name, metrics in cases.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if metrics['time'] > base['time'] * (1 + TIME_TOLERANCE):
+            regressions += [name + " time " + str(round(metrics['time'], 3)) + "s > "
+                            + str(round(base['time'], 3)) + "s"]
+        if metrics['peak_mb'] > base['peak_mb'] * (1 + MEMORY_TOLERANCE):
+            regressions += [name + " peak memory " + str(round(metrics['peak_mb'], 1)) + "MB > "
+                            + str(round(base['peak_mb'], 1)) + "MB"]
+        if metrics['files'] > base['files']:
+            regressions += [name + " opens " + str(metrics['files']) + " files > " + str(base['files'])]
+    return regressions
+
+
+def run_benchmarks(cases=None, scale=1, repeat=3, save_baseline=False, data_dir='data'):
+    """ Run the benchmark cases, append the results to the history and compare them to the baseline
+
+    Args:
+        cases (list): Cases to run, every case in CASES when None
+        scale (int): Number of copies of every player in the synthetic data, 1 for the committed data
+        repeat (int): Number of timed runs to take the best of
+        save_baseline (bool): Store the results as the baseline of their scale
+        data_dir (str): Folder containing the season folders
+
+    Returns the regressions found, as a list of descriptions.
+    """
+    if cases is None:
+        cases = CASES
+    workspace = tempfile.mkdtemp(prefix='fpl_benchmark_')
+    try:
+        make_workspace(workspace, scale, data_dir)
+        results = {}
+        for name in cases:
+            results[name] = measure(name, workspace, repeat)
+            print(name.ljust(26) + str(round(results[name]['time'], 3)).rjust(8) + "s"
+                  + str(round(results[name]['peak_mb'], 1)).rjust(9) + "MB"
+                  + str(results[name]['files']).rjust(7) + " files")
+    finally:
+        shutil.rmtree(workspace)
+
+    run = {'timestamp': datetime.utcnow().strftime(TIMESTAMP_FORMAT), 'commit': get_commit(),
+           'scale': scale, 'cases': results}
+    history = load_json(get_history_path(), [])
+    write_json(get_history_path(), history + [run])
+
+    baselines = load_json(get_baseline_path(), {})
+    if save_baseline:
+        baselines[str(scale)] = dict(baselines.get(str(scale), {}), **results)
+        write_json(get_baseline_path(), baselines)
+        return []
+    regressions = find_regressions(results, baselines.get(str(scale), {}))
+    for regression in regressions:
+        print("Regression: " + regression)
+    return regressions
+
+
+def main():
+    if '-h' in sys.argv or '--help' in sys.argv:
+        print("Usage: python benchmark.py [--scale N] [--baseline] [case ...]. Eg: python benchmark.py --scale 10 merge_data")
+        sys.exit(1)
+    args = sys.argv[1:]
+    scale = 1
+    if '--scale' in args:
+        i = args.index('--scale')
+        scale = int(args[i + 1])
+        args = args[:i] + args[i + 2:]
+    save_baseline = '--baseline' in args
+    cases = [a for a in args if a != '--baseline'] or None
+    if run_benchmarks(cases, scale, save_baseline=save_baseline):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+from season_loader import load_season
+
+ROW_COLUMNS = ['name', 'element', 'fixture', 'GW', 'position', 'minutes', 'goals_scored', 'assists',
+               'clean_sheets', 'goals_conceded', 'saves', 'penalties_saved', 'penalties_missed',
+               'yellow_cards', 'red_cards', 'own_goals', 'bps', 'bonus', 'total_points']
+# element_type of players_raw.csv -> position, named like the rule maps of new_position_checker
+POSITIONS = {1: 'GKP', 2: 'DEF', 3: 'MID', 4: 'FWD'}
+
+
+def load_bonus_rows(season, data_dir='data'):
+    """ Gameweek rows of a season with every player's position
+
+    Seasons whose gameweek files have no position take it from players_raw.csv.
+    Goalkeepers are 'GKP' in every season.
+    """
+    df = load_season(season, ROW_COLUMNS, data_dir)
+    players = pd.read_csv(os.path.join(os.getcwd(), data_dir, season, 'players_raw.csv'),
+                          usecols=['id', 'element_type'])
+    positions = pd.Series(players['element_type'].map(POSITIONS).to_numpy(), index=players['id'])
+    df['position'] = df['position'].fillna(df['element'].map(positions)).replace('GK', 'GKP')
+    return df
+
+
+def get_rule_delta(df, rules):
+    """ Change of every row's score under a rule delta
+
+    Args:
+        df: Gameweek rows with a 'position' column and the rules' stats
+        rules (dict): stat -> {position: change per unit of the stat}, e.g.
+            {'goals_scored': {'DEF': 6, 'MID': 0}}; missing positions are unchanged
+    """
+    delta = np.zeros(len(df))
+    for stat, by_position in (rules or {}).items():
+        per_unit = df['position'].map(by_position).astype('float64').fillna(0).to_numpy()
+        delta += df[stat].astype('float64').fillna(0).to_numpy() * per_unit
+    return delta
+
+
+def rank_bonus(df, bps):
+    """ Bonus of every row from the BPS of the players of its fixture
+
+    Players are ranked with the lowest rank of a tie and a player of rank r
+    gets 4 - r points, which is FPL's tie rule: players tied for first all
+    get 3 and the next one 1, players tied for second both get 2 and nobody
+    gets 1, and players tied for third all get 1. Only players who played
+    can get bonus.
+
+    Args:
+        df: Gameweek rows with 'fixture', 'minutes' and 'season' when there are several seasons
+        bps: BPS of every row
+    """
+    keys = ['season', 'fixture'] if 'season' in df else ['fixture']
+    played = df['minutes'].fillna(0).to_numpy() > 0
+    bps = pd.Series(np.where(played, bps, np.nan), index=df.index)
+    rank = bps.groupby([df[k] for k in keys]).rank(method='min', ascending=False)
+    return np.clip(4 - rank.fillna(4).to_numpy(), 0, 3).astype('int32')
+
+
+def recompute_bonus(df, bps_rules=None, points_rules=None):
+    """ New BPS, bonus and total points of every row under a change of rules
+
+    The BPS delta is applied to every row at once and every fixture is
+    ranked again in one grouped rank.
+
+    Args:
+        df: Gameweek rows as returned by load_bonus_rows, of one or more seasons
+        bps_rules (dict): stat -> {position: BPS change per unit}
+        points_rules (dict): stat -> {position: points change per unit}, besides the bonus
+
+    Returns a df with the key columns, the original and the new bps, bonus and total_points.
+    """
+    bps = df['bps'].astype('float64').fillna(0).to_numpy() + get_rule_delta(df, bps_rules)
+    bonus = rank_bonus(df, bps)
+    old_bonus = df['bonus'].astype('float64').fillna(0).to_numpy()
+    total_points = (df['total_points'].astype('float64').fillna(0).to_numpy() - old_bonus + bonus
+                    + get_rule_delta(df, points_rules))
+    keys = [c for c in ['season', 'GW', 'fixture', 'element', 'name', 'position'] if c in df]
+    result = df[keys + ['bps', 'bonus', 'total_points']].copy()
+    result['new_bps'] = bps.astype('int32')
+    result['new_bonus'] = bonus
+    result['new_total_points'] = total_points.astype('int32')
+    return result
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python bonus_engine.py <season>. Eg: python bonus_engine.py 2023-24")
+        sys.exit(1)
+    result = recompute_bonus(load_bonus_rows(sys.argv[1]))
+    same = (result['new_bonus'] == result['bonus'].fillna(0)).mean()
+    print("Bonus reproduced for " + str(round(same * 100, 2)) + "% of rows")
+
+if __name__ == '__main__':
+    main()
@@ -1,38 +1,105 @@
 import os
 import sys
 import csv
+from player_archive import ARCHIVE_FILENAME, PlayerArchive
+from season_loader import detect_encoding
+
+# element_type of players_raw.csv -> position
+pos_dict = {1: "GK", 2: "DEF", 3: "MID", 4: "FWD"}
+
+
+def read_rows(path):
+    with open(path, 'r', encoding=detect_encoding(path)) as fin:
+        reader = csv.DictReader(fin)
+        return reader.fieldnames, list(reader)
+
 
 def get_teams(directory):
-    teams = {}
-    fin = open(directory + "/teams.csv", 'r')
-    reader = csv.DictReader(fin)
-    for row in reader:
-        teams[int(row['id'])] = row['name']
-    return teams
+    """ Gets the teams of a season as a dict of id -> name
+
+    Seasons without teams.csv take their team names from master_team_list.csv.
+    """
+    teams_path = os.path.join(directory, "teams.csv")
+    if os.path.exists(teams_path):
+        return {int(row['id']): row['name'] for row in read_rows(teams_path)[1]}
+    season = os.path.basename(os.path.normpath(directory))
+    master_path = os.path.join(os.path.dirname(os.path.normpath(directory)), 'master_team_list.csv')
+    return {int(row['team']): row['team_name'] for row in read_rows(master_path)[1]
+            if row['season'] == season}
 
 
 def get_fixtures(directory):
+    """ Gets the home and away team of every fixture, empty without fixtures.csv
+    """
     fixtures_home = {}
     fixtures_away = {}
-    fin = open(directory + "/fixtures.csv", 'r')
-    reader = csv.DictReader(fin)
-    for row in reader:
+    path = os.path.join(directory, "fixtures.csv")
+    if not os.path.exists(path):
+        return fixtures_home, fixtures_away
+    for row in read_rows(path)[1]:
         fixtures_home[int(row['id'])] = int(row['team_h'])
         fixtures_away[int(row['id'])] = int(row['team_a'])
     return fixtures_home, fixtures_away
 
 
+def get_played_gws(directory, players=None):
+    """ Sorted ids of the gameweeks of a season that have been played
+
+    These are the gameweeks with a finished fixture in fixtures.csv, or else
+    the rounds recorded in the players' gw.csv files.
+
+    Args:
+        directory (str): Season folder, e.g. 'data/2024-25'
+        players (list): Players as returned by read_player_gws, read from the
+            season's players folder when needed and None
+    """
+    path = os.path.join(directory, "fixtures.csv")
+    if os.path.exists(path):
+        rows = read_rows(path)[1]
+        if len(rows) > 0 and 'finished' in rows[0]:
+            return sorted(set(int(row['event']) for row in rows
+                              if row['event'] != '' and row['finished'] == 'True'))
+    if players is None:
+        players = read_player_gws(os.path.join(directory, 'players'))
+    return sorted(set(int(row['round']) for _, _, rows in players for row in rows))
+
+
 def get_positions(directory):
     positions = {}
     names = {}
-    pos_dict = {'1': "GK", '2': "DEF", '3': "MID", '4': "FWD"}
-    fin = open(directory + "/players_raw.csv", 'r',encoding="utf-8")
-    reader = csv.DictReader(fin)
-    for row in reader:
-        positions[int(row['id'])] = pos_dict[row['element_type']] 
+    for row in read_rows(os.path.join(directory, "players_raw.csv"))[1]:
+        positions[int(row['id'])] = pos_dict[int(row['element_type'])]
         names[int(row['id'])] = row['first_name'] + ' ' + row['second_name']
     return names, positions
 
+
+def is_home(row):
+    return row['was_home'] == True or row['was_home'] == "True"
+
+
+def load_lookups(directory, players):
+    """ Everything a season's gameweeks need that does not depend on the gameweek
+
+    Without fixtures.csv, a fixture's teams come from the players' rows: a
+    home player's opponent is the away team and vice versa.
+
+    Args:
+        directory (str): Season folder, e.g. 'data/2024-25'
+        players (list): Players as returned by read_player_gws
+    """
+    names, positions = get_positions(directory)
+    teams = get_teams(directory)
+    fixtures_home, fixtures_away = get_fixtures(directory)
+    if len(fixtures_home) == 0:
+        for _, _, rows in players:
+            for row in rows:
+                if is_home(row):
+                    fixtures_away[int(row['fixture'])] = int(row['opponent_team'])
+                else:
+                    fixtures_home[int(row['fixture'])] = int(row['opponent_team'])
+    return names, positions, teams, fixtures_home, fixtures_away
+
+
 def get_expected_points(gw, directory):
     xPoints = {}
     try:
@@ -65,48 +132,90 @@ def merge_gw(gw, gw_directory):
     for row in rows:
         writer.writerow(row)
 
-def collect_gw(gw, directory_name, output_dir, root_directory_name="data/2024-25"):
+def iter_player_gws(directory_name, archive=None):
+    """ Yield (element id, gw.csv fieldnames, gw.csv rows) of every player
+
+    Reads the packed players.pack archive when one is given or the season has
+    no players folder, the per-player folders otherwise. Folders of the 2016-17
+    to 2018-19 seasons are named without the id, which then comes from the
+    rows' 'element' column.
+    """
+    packed = os.path.join(os.path.dirname(os.path.normpath(directory_name)), ARCHIVE_FILENAME)
+    if archive is None and not os.path.isdir(directory_name) and os.path.exists(packed):
+        archive = packed
+    if archive is not None:
+        with PlayerArchive(archive) as players:
+            for id in players.elements():
+                rows = players.read_rows(id)
+                if rows:
+                    yield id, list(rows[0].keys()), rows
+        return
+    for folder in sorted(os.listdir(directory_name)):
+        path = os.path.join(directory_name, folder, 'gw.csv')
+        if not os.path.exists(path):
+            continue
+        fieldnames, rows = read_rows(path)
+        if len(rows) == 0:
+            continue
+        suffix = folder.split('_')[-1]
+        yield int(suffix) if suffix.isdigit() else int(rows[0]['element']), fieldnames, rows
+
+def read_player_gws(directory_name, archive=None):
+    return list(iter_player_gws(directory_name, archive))
+
+def collect_gw(gw, directory_name, output_dir, root_directory_name="data/2024-25", archive=None,
+               players=None, lookups=None, xp_directory=None):
+    """ Write gwN.csv of a gameweek from the players' gw.csv rows
+
+    Args:
+        gw (int): ID of the gameweek
+        directory_name (str): Players folder of the season
+        output_dir (str): Folder gwN.csv is written to
+        root_directory_name (str): Season folder
+        archive (str): players.pack to read the players from instead of their folders
+        players (list): Already read players as returned by read_player_gws
+        lookups (tuple): Already loaded lookups as returned by load_lookups
+        xp_directory (str): Folder of the xPN.csv files, output_dir when None
+    """
+    if players is None:
+        players = read_player_gws(directory_name, archive)
+    if lookups is None:
+        lookups = load_lookups(root_directory_name, players)
+    names, positions, teams, fixtures_home, fixtures_away = lookups
+    xPoints = get_expected_points(gw, output_dir if xp_directory is None else xp_directory)
     rows = []
     fieldnames = []
-    fixtures_home, fixtures_away = get_fixtures(root_directory_name)
-    teams = get_teams(root_directory_name)
-    names, positions = get_positions(root_directory_name)
-    xPoints = get_expected_points(gw, output_dir)
-    for root, dirs, files in os.walk(u"./" + directory_name):
-        for fname in files:
-            if fname == 'gw.csv':
-                fpath = os.path.join(root, fname)
-                fin = open(fpath, 'r')
-                reader = csv.DictReader(fin)
-                fieldnames = reader.fieldnames
-                for row in reader:
-                    if int(row['round']) == gw:
-                        id = int(os.path.basename(root).split('_')[-1])
-                        name = names[id]
-                        position = positions[id]
-                        fixture = int(row['fixture'])
-                        if row['was_home'] == True or row['was_home'] == "True":
-                            row['team'] = teams[fixtures_home[fixture]]
-                        else:
-                            row['team'] = teams[fixtures_away[fixture]]
-                        row['name'] = name
-                        row['position'] = position
-                        if id in xPoints:
-                            row['xP'] = xPoints[id]
-                        else:
-                            row['xP'] = 0.0
-                        rows += [row]
+    for id, player_fieldnames, player_rows in players:
+        fieldnames += [f for f in player_fieldnames if f not in fieldnames]
+        for row in player_rows:
+            if int(row['round']) == gw:
+                fixture = int(row['fixture'])
+                if is_home(row):
+                    row['team'] = teams[fixtures_home[fixture]]
+                else:
+                    row['team'] = teams[fixtures_away[fixture]]
+                row['name'] = names[id]
+                row['position'] = positions[id]
+                if id in xPoints:
+                    row['xP'] = xPoints[id]
+                else:
+                    row['xP'] = 0.0
+                rows += [row]
 
     fieldnames = ['name', 'position', 'team', 'xP'] + fieldnames
-    outf = open(os.path.join(output_dir, "gw" + str(gw) + ".csv"), 'w', encoding="utf-8")
-    writer = csv.DictWriter(outf, fieldnames=fieldnames, lineterminator='\n')
-    writer.writeheader()
-    for row in rows:
-        writer.writerow(row)
+    with open(os.path.join(output_dir, "gw" + str(gw) + ".csv"), 'w', encoding="utf-8") as outf:
+        writer = csv.DictWriter(outf, fieldnames=fieldnames, lineterminator='\n')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
 
 def collect_all_gws(directory_name, output_dir, root_dir):
-    for i in range(1,17):
-        collect_gw(i, directory_name, output_dir, root_dir)
+    """ Collect every gameweek of a season that has been played
+    """
+    players = read_player_gws(directory_name)
+    lookups = load_lookups(root_dir, players)
+    for gw in get_played_gws(root_dir, players):
+        collect_gw(gw, directory_name, output_dir, root_dir, players=players, lookups=lookups)
 
 def merge_all_gws(num_gws, gw_directory):
     for i in range(1, num_gws):
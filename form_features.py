@@ -0,0 +1,163 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+from season_loader import SEASON_SCHEMAS, load_season
+from player_identity import add_player_ids, build_identity_table
+
+# Number of most recent appearances each rolling window covers
+WINDOWS = [3, 5, 10]
+
+ROW_COLUMNS = ['player_id', 'season', 'GW', 'fixture', 'kickoff_time', 'element', 'name']
+METRIC_COLUMNS = ['total_points', 'minutes', 'bps', 'expected_goals', 'expected_assists']
+
+
+def get_features_path(data_dir='data'):
+    return os.path.join(os.getcwd(), data_dir, 'form_features.csv')
+
+
+def get_state_path(data_dir='data'):
+    return os.path.join(os.getcwd(), data_dir, 'form_state.csv')
+
+
+def load_rows(season, gw=None, data_dir='data'):
+    """ Load the gameweek rows of a season (or a single gameweek) with player ids
+    """
+    columns = [c for c in ROW_COLUMNS if c not in ['player_id', 'season']] + METRIC_COLUMNS
+    df = load_season(season, columns, data_dir, gw=gw)
+    return add_player_ids(df, data_dir)
+
+
+def window_sums(values, starts):
+    """ Sum of values[start:i+1] for every row i, from a single prefix sum
+
+    Args:
+        values: 1-d array of per-row values, sorted by player
+        starts: 1-d array of the first row index of each row's window
+    """
+    prefix = np.concatenate([[0.0], np.cumsum(values, dtype='float64')])
+    return prefix[np.arange(1, len(values) + 1)] - prefix[starts]
+
+
+def compute_features(df):
+    """ Compute the rolling form features of every row of df
+
+    df must be sorted by player and kickoff time. Every window covers a player's
+    last N appearances up to and including the row, and is computed for all
+    players at once from prefix sums.
+
+    Args:
+        df: df with the ROW_COLUMNS and METRIC_COLUMNS
+    """
+    n = len(df)
+    player = df['player_id'].to_numpy()
+    index = np.arange(n)
+    new_player = np.ones(n, dtype=bool)
+    new_player[1:] = player[1:] != player[:-1]
+    group_start = np.maximum.accumulate(np.where(new_player, index, 0))
+    # position of each row within its player's rows, for the bps trend
+    x = (index - group_start).astype('float64')
+
+    points = df['total_points'].astype('float64').fillna(0).to_numpy()
+    minutes = df['minutes'].astype('float64').fillna(0).to_numpy()
+    bps = df['bps'].astype('float64').fillna(0).to_numpy()
+    xg = df['expected_goals'].astype('float64').to_numpy()
+    xa = df['expected_assists'].astype('float64').to_numpy()
+    xg_minutes = np.where(np.isnan(xg), 0, minutes)
+    xa_minutes = np.where(np.isnan(xa), 0, minutes)
+
+    features = df[ROW_COLUMNS].copy()
+    for w in WINDOWS:
+        starts = np.maximum(index - w + 1, group_start)
+        count = window_sums(np.ones(n), starts)
+        mins = window_sums(minutes, starts)
+        features['points_last' + str(w)] = window_sums(points, starts)
+        features['minutes_last' + str(w)] = mins
+        with np.errstate(divide='ignore', invalid='ignore'):
+            features['xg_per90_last' + str(w)] = np.where(
+                window_sums(xg_minutes, starts) > 0,
+                window_sums(np.nan_to_num(xg), starts) / window_sums(xg_minutes, starts) * 90, np.nan)
+            features['xa_per90_last' + str(w)] = np.where(
+                window_sums(xa_minutes, starts) > 0,
+                window_sums(np.nan_to_num(xa), starts) / window_sums(xa_minutes, starts) * 90, np.nan)
+            features['bps_mean_last' + str(w)] = window_sums(bps, starts) / count
+            # least squares slope of bps over the appearances in the window
+            sx = window_sums(x, starts)
+            sy = window_sums(bps, starts)
+            sxy = window_sums(x * bps, starts)
+            sxx = window_sums(x * x, starts)
+            denominator = count * sxx - sx * sx
+            features['bps_trend_last' + str(w)] = np.where(
+                denominator > 0, (count * sxy - sx * sy) / denominator, np.nan)
+    return features
+
+
+def sort_rows(df):
+    return df.sort_values(['player_id', 'kickoff_time', 'fixture'], kind='stable').reset_index(drop=True)
+
+
+def get_window_state(df):
+    """ The last max(WINDOWS) rows of every player, all that later windows need
+    """
+    return df.groupby('player_id', sort=False).tail(max(WINDOWS))
+
+
+def build_form_features(seasons=None, data_dir='data'):
+    """ Compute the features of every season from scratch and persist the window state
+
+    Args:
+        seasons (list): Seasons to include, every season in the schema registry when None
+        data_dir (str): Folder containing the season folders
+    """
+    if seasons is None:
+        seasons = list(SEASON_SCHEMAS)
+    df = pd.concat([load_rows(season, data_dir=data_dir) for season in seasons], ignore_index=True)
+    df = sort_rows(df)
+    features = compute_features(df)
+    features.to_csv(get_features_path(data_dir), index=False)
+    get_window_state(df).to_csv(get_state_path(data_dir), index=False)
+    return features
+
+
+def update_form_features(season, gw, data_dir='data'):
+    """ Compute and append the features of a single new gameweek
+
+    Only the stored window state and the new gameweek's rows are read, so the
+    cost does not grow with the length of the history.
+
+    Args:
+        season (str): Name of the season folder, e.g. '2024-25'
+        gw (int): ID of the gameweek that was added
+        data_dir (str): Folder containing the season folders
+    """
+    build_identity_table([season], data_dir)
+    new_rows = load_rows(season, gw, data_dir)
+    state_path = get_state_path(data_dir)
+    if os.path.exists(state_path):
+        state = pd.read_csv(state_path, dtype={c: new_rows[c].dtype for c in new_rows.columns})
+        if ((state['season'] == season) & (state['GW'] == gw)).any():
+            print(season + " gw" + str(gw) + " already has form features")
+            return None
+    else:
+        state = new_rows.iloc[0:0]
+    df = sort_rows(pd.concat([state, new_rows], ignore_index=True))
+    is_new = ((df['season'] == season) & (df['GW'] == gw)).to_numpy()
+    features = compute_features(df)[is_new]
+
+    features_path = get_features_path(data_dir)
+    if os.path.exists(features_path):
+        features.to_csv(features_path, mode='a', header=False, index=False)
+    else:
+        features.to_csv(features_path, index=False)
+    get_window_state(df).to_csv(state_path, index=False)
+    return features
+
+
+def main():
+    if len(sys.argv) == 3:
+        update_form_features(sys.argv[1], int(sys.argv[2]))
+    else:
+        build_form_features()
+
+if __name__ == '__main__':
+    main()
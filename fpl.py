@@ -0,0 +1,112 @@
+import importlib
+import os
+import subprocess
+import sys
+import time
+
+# Subcommand -> (module whose main() runs it, description). Modules are only
+# imported once their subcommand is chosen, so `fpl.py gameweek` never pays
+# for pandas or bs4.
+COMMANDS = {
+    'scrape': ('global_scraper', "Scrape the current season and collect the current gameweek"),
+    'team': ('teams_scraper', "Scrape the history of a team"),
+    'top-players': ('top_players', "Write the top players of the season"),
+    'gameweek': ('gameweek', "Print the most recent gameweek id"),
+    'schedule': ('schedule', "Print cron lines for the season's scrapes"),
+    'scheduler': ('scheduler', "Run the adaptive scraping scheduler"),
+    'live': ('live_collector', "Collect live gameweek scores"),
+    'snapshots': ('snapshot', "List or clear the shared API snapshots"),
+    'prices': ('price_history', "Record a price snapshot or show the state at a time"),
+    'understat': ('understat', "Scrape understat data"),
+    'fbref': ('fbref', "Scrape fbref data"),
+    'shots': ('shot_store', "Print the top box xG per player and gameweek"),
+    'backfill': ('backfill', "Rebuild the gameweek files of past seasons"),
+    'merge': ('global_merger', "Merge every season's gameweeks"),
+    'identity': ('player_identity', "Build the cross-season player identity table"),
+    'form': ('form_features', "Build or update the rolling form features"),
+    'team-fixtures': ('team_fixtures', "Build or update the team per fixture cube"),
+    'join': ('match_join', "Join FPL, understat and fbref rows per player and match"),
+    'bonus': ('bonus_engine', "Check the bonus engine reproduces a season's bonus"),
+    'backtest': ('xp_backtest', "Backtest xP against the points scored"),
+    'optimize': ('optimizer', "Pick the best squad for a budget"),
+    'plan': ('transfer_planner', "Plan transfers over the next gameweeks"),
+    'simulate': ('league_simulator', "Simulate a mini-league's final standings"),
+    'ownership': ('ownership', "Aggregate top manager ownership"),
+    'manifest': ('manifest', "Build or diff the data manifests"),
+    'archive': ('player_archive', "Pack or export a season's player files"),
+    'benchmark': ('benchmark', "Benchmark the collector, merger, parsers and position checker"),
+}
+# Modules that must not be imported just to start the CLI
+HEAVY_MODULES = ['pandas', 'numpy', 'bs4', 'requests']
+# Most the CLI may add to the interpreter's own startup time, in seconds
+STARTUP_BUDGET = 0.05
+
+
+def usage():
+    print("Usage: python fpl.py <command> [args]. Eg: python fpl.py gameweek")
+    for name, (_, description) in COMMANDS.items():
+        print("  " + name.ljust(12) + description)
+    print("  " + "bench".ljust(12) + "Benchmark the import time of every command")
+
+
+def run_command(name, args):
+    """ Import the module of a subcommand and run its main() with the remaining arguments
+    """
+    module_name = COMMANDS[name][0]
+    module = importlib.import_module(module_name)
+    sys.argv = [module_name + '.py'] + args
+    module.main()
+
+
+def time_python(code, repeat=5):
+    """ Best wall time of a fresh interpreter running `code`, in seconds
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark_imports(repeat=5):
+    """ Print the startup time of the CLI and the import time of every command
+
+    Returns False when the CLI imports a heavy module or takes more than
+    STARTUP_BUDGET over a bare interpreter to start.
+
+    Args:
+        repeat (int): Number of runs to take the best time of
+    """
+    baseline = time_python('pass', repeat)
+    cli = time_python('import fpl', repeat) - baseline
+    print("interpreter".ljust(16) + str(round(baseline * 1000, 1)) + "ms")
+    print("fpl".ljust(16) + "+" + str(round(cli * 1000, 1)) + "ms")
+    for name, (module_name, _) in COMMANDS.items():
+        elapsed = time_python('import ' + module_name, repeat) - baseline
+        print(name.ljust(16) + "+" + str(round(elapsed * 1000, 1)) + "ms")
+
+    ok = cli <= STARTUP_BUDGET
+    if not ok:
+        print("fpl.py startup is over its budget of " + str(STARTUP_BUDGET * 1000) + "ms")
+    code = 'import sys, fpl; print(",".join(m for m in fpl.HEAVY_MODULES if m in sys.modules))'
+    imported = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    if imported:
+        print("fpl.py imports " + imported + " on startup")
+        ok = False
+    return ok
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in list(COMMANDS) + ['bench']:
+        usage()
+        sys.exit(1)
+    if sys.argv[1] == 'bench':
+        if not benchmark_imports():
+            sys.exit(1)
+        return
+    run_command(sys.argv[1], sys.argv[2:])
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,5 @@
 from datetime import datetime
-import requests
-import json
+from getters import get_data
 
 
 def get_recent_gameweek_id():
@@ -8,8 +7,7 @@ def get_recent_gameweek_id():
     Get's the most recent gameweek's ID.
     """
 
-    data = requests.get('https://fantasy.premierleague.com/api/bootstrap-static/')
-    data = json.loads(data.content)
+    data = get_data()
 
     gameweeks = data['events']
     
@@ -20,5 +18,27 @@ def get_recent_gameweek_id():
             return gameweek['id'] - 1
 
 
-if __name__ == '__main__':
+def get_recent_gameweek_id_from_fixtures(fixtures, now=None):
+    """
+    Get's the most recent gameweek's ID from already fetched fixtures data,
+    i.e. the latest gameweek with a fixture that has kicked off.
+    """
+
+    if now is None:
+        now = datetime.utcnow()
+    recent = 0
+    for fixture in fixtures:
+        if fixture['event'] is None or fixture['kickoff_time'] is None:
+            continue
+        kickoff = datetime.strptime(fixture['kickoff_time'], '%Y-%m-%dT%H:%M:%SZ')
+        if kickoff <= now and fixture['event'] > recent:
+            recent = fixture['event']
+    return recent
+
+
+def main():
     print(get_recent_gameweek_id())
+
+
+if __name__ == '__main__':
+    main()
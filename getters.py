@@ -1,9 +1,10 @@
 import requests
 import json
 import time
+from snapshot import FRESHNESS, get_snapshot
 
-def get_data():
-    """ Retrieve the fpl player data from the hard-coded url
+def fetch_data():
+    """ Fetch the fpl player data from the hard-coded url
     """
     response = requests.get("https://fantasy.premierleague.com/api/bootstrap-static/")
     if response.status_code != 200:
@@ -12,6 +13,14 @@ def get_data():
     data = json.loads(responseStr)
     return data
 
+def get_data(max_age=FRESHNESS):
+    """ Retrieve the fpl player data, shared with other tools through the snapshot store
+
+    Args:
+        max_age (int): Oldest snapshot to reuse, in seconds, 0 to always fetch
+    """
+    return get_snapshot('bootstrap-static', fetch_data, max_age)
+
 def get_individual_player_data(player_id):
     """ Retrieve the player-specific detailed data
 
@@ -110,8 +119,8 @@ def get_entry_transfers_data(entry_id):
     data = json.loads(response.text)
     return data
 
-def get_fixtures_data():
-    """ Retrieve the fixtures data for the season
+def fetch_fixtures_data():
+    """ Fetch the fixtures data for the season
     """
     url = "https://fantasy.premierleague.com/api/fixtures/"
     response = ''
@@ -125,6 +134,33 @@ def get_fixtures_data():
     data = json.loads(response.text)
     return data
 
+def get_fixtures_data(max_age=FRESHNESS):
+    """ Retrieve the fixtures data for the season, shared with other tools through the snapshot store
+
+    Args:
+        max_age (int): Oldest snapshot to reuse, in seconds, 0 to always fetch
+    """
+    return get_snapshot('fixtures', fetch_fixtures_data, max_age)
+
+def get_live_data(gw):
+    """ Retrieve the live stats of every player for a gameweek
+
+    Args:
+        gw (int): ID of the gameweek whose live data is to be retrieved
+    """
+    base_url = "https://fantasy.premierleague.com/api/event/"
+    full_url = base_url + str(gw) + "/live/"
+    response = ''
+    while response == '':
+        try:
+            response = requests.get(full_url)
+        except:
+            time.sleep(5)
+    if response.status_code != 200:
+        raise Exception("Response was code " + str(response.status_code))
+    data = json.loads(response.text)
+    return data
+
 def main():
     data = get_data()
     with open('raw.json', 'w') as outf:
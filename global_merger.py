@@ -1,37 +1,87 @@
+import sys
 from mergers import *
+from season_loader import load_season
+from player_identity import add_player_ids
+
+SEASONS = ['2016-17', '2017-18', '2018-19', '2019-20', '2020-21', '2021-22', '2022-23', '2023-24']
+COLUMNS = ['name', 'position', 'team', 'assists','bonus','bps','clean_sheets','creativity','element','fixture','goals_conceded','goals_scored','ict_index','influence','kickoff_time','minutes','opponent_team','own_goals','penalties_missed','penalties_saved','red_cards','round','saves','selected','team_a_score','team_h_score','threat','total_points','transfers_balance','transfers_in','transfers_out','value','was_home','yellow_cards','GW']
+OUTPUT_COLUMNS = ['season_x', 'name', 'player_id', 'position', 'team_x', 'assists', 'bonus', 'bps',
+       'clean_sheets', 'creativity', 'element', 'fixture', 'goals_conceded',
+       'goals_scored', 'ict_index', 'influence', 'kickoff_time', 'minutes',
+       'opponent_team', 'opp_team_name', 'own_goals', 'penalties_missed', 'penalties_saved',
+       'red_cards', 'round', 'saves', 'selected', 'team_a_score',
+       'team_h_score', 'threat', 'total_points', 'transfers_balance',
+       'transfers_in', 'transfers_out', 'value', 'was_home', 'yellow_cards',
+       'GW']
 
 def merge_data():
     """ Merge all the data and export to a new file
     """
-    season_latin = ['2016-17', '2017-18', '2018-19', '2019-20', '2020-21', '2021-22', '2022-23', '2023-24'] 
-    encoding_latin = ['latin-1', 'latin-1', 'latin-1', 'utf-8', 'utf-8', 'utf-8', 'utf-8', 'utf-8']
-
     dfs = []
-    for i,j in zip(season_latin, encoding_latin):
-        data = pd.read_csv(import_merged_gw(season=f'{i}'), encoding=f'{j}')
-        data['season'] = i
-        dfs.append(data)
+    for season in SEASONS:
+        dfs.append(load_season(season, COLUMNS))
 
     df = pd.concat(dfs, ignore_index=True, sort=False)
-    df = df[['season','name', 'position', 'team', 'assists','bonus','bps','clean_sheets','creativity','element','fixture','goals_conceded','goals_scored','ict_index','influence','kickoff_time','minutes','opponent_team','own_goals','penalties_missed','penalties_saved','red_cards','round','saves','selected','team_a_score','team_h_score','threat','total_points','transfers_balance','transfers_in','transfers_out','value','was_home','yellow_cards','GW']]
+    df = add_player_ids(df)
 
     df = clean_players_name_string(df, col='name')
-    df = filter_players_exist_latest(df, col='position')
+    df = filter_players_exist_latest(df, col='position', key='player_id')
     df = get_opponent_team_name(df)
 
-    df = df[['season_x', 'name', 'position', 'team_x', 'assists', 'bonus', 'bps',
-       'clean_sheets', 'creativity', 'element', 'fixture', 'goals_conceded',
-       'goals_scored', 'ict_index', 'influence', 'kickoff_time', 'minutes',
-       'opponent_team', 'opp_team_name', 'own_goals', 'penalties_missed', 'penalties_saved',
-       'red_cards', 'round', 'saves', 'selected', 'team_a_score',
-       'team_h_score', 'threat', 'total_points', 'transfers_balance',
-       'transfers_in', 'transfers_out', 'value', 'was_home', 'yellow_cards',
-       'GW']]
+    df = df[OUTPUT_COLUMNS]
     
     export_cleaned_data(df)
 
+def get_first_positions(seasons):
+    """ Gets the first non-null position of every player, in chronological order
+
+    Only the element and position columns are loaded, one season at a time.
+
+    Args:
+        seasons (list): Seasons in chronological order
+    """
+    first = {}
+    for season in seasons:
+        df = add_player_ids(load_season(season, ['element', 'position']))
+        df = df[df['position'].notnull()].drop_duplicates('player_id')
+        for player_id, position in zip(df['player_id'], df['position']):
+            first.setdefault(player_id, position)
+    return first
+
+def merge_data_streaming(seasons=None):
+    """ Same output as merge_data, holding only one season in memory at a time
+
+    filter_players_exist_latest fills a missing position from the player's
+    previous row, or else from his next one. Within a season the previous row
+    comes from a forward fill, across seasons from the last position seen so
+    far, and a row with no position before it gets the player's first
+    position, which is looked up for every season up front.
+
+    Args:
+        seasons (list): Seasons in chronological order, SEASONS when None
+    """
+    if seasons is None:
+        seasons = SEASONS
+    first_positions = get_first_positions(seasons)
+    last_positions = {}
+    for i, season in enumerate(seasons):
+        df = add_player_ids(load_season(season, COLUMNS))
+        df = clean_players_name_string(df, col='name')
+        df['position'] = df.groupby('player_id')['position'].ffill()
+        missing = df['position'].isnull()
+        carried = df.loc[missing, 'player_id'].map(last_positions)
+        carried = carried.fillna(df.loc[missing, 'player_id'].map(first_positions))
+        df.loc[missing, 'position'] = carried
+        df = df[df['position'].notnull()]
+        last_positions.update(df.groupby('player_id')['position'].last().to_dict())
+        df = get_opponent_team_name(df)
+        export_cleaned_data(df[OUTPUT_COLUMNS], append=i > 0)
+
 def main():
-    merge_data()
+    if len(sys.argv) > 1 and sys.argv[1] == '--stream':
+        merge_data_streaming()
+    else:
+        merge_data()
 
 if __name__ == "__main__":
     main()
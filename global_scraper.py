@@ -2,7 +2,10 @@ from parsers import *
 from cleaners import *
 from getters import *
 from collector import collect_gw, merge_gw
-from understat import parse_epl_data
+from player_archive import ARCHIVE_FILENAME, ArchiveWriter
+from understat import refresh_epl_data
+from form_features import update_form_features
+from team_fixtures import update_team_fixtures
 import csv
 
 def parse_data():
@@ -38,10 +41,20 @@ def parse_data():
     player_base_filename = base_filename + 'players/'
     gw_base_filename = base_filename + 'gws/'
     print("Extracting player specific data")
-    for i,name in player_ids.items():
-        player_data = get_individual_player_data(i)
-        parse_player_history(player_data["history_past"], player_base_filename, name, i)
-        parse_player_gw_history(player_data["history"], player_base_filename, name, i)
+    # the per-player folders are the published layout, the archive is an extra
+    # copy of the same files for tools reading many players at once
+    archive = base_filename + ARCHIVE_FILENAME
+    with ArchiveWriter(archive) as players:
+        for i,name in player_ids.items():
+            player_data = get_individual_player_data(i)
+            parse_player_history(player_data["history_past"], player_base_filename, name, i)
+            parse_player_gw_history(player_data["history"], player_base_filename, name, i)
+            contents = {}
+            if len(player_data["history"]) > 0:
+                contents['gw.csv'] = format_stats(player_data["history"]).encode('utf8')
+            if len(player_data["history_past"]) > 0:
+                contents['history.csv'] = format_stats(player_data["history_past"]).encode('utf8')
+            players.add(name + '_' + str(i), contents)
     if gw_num > 0:
         print("Writing expected points")
         with open(os.path.join(gw_base_filename, 'xP' + str(gw_num) + '.csv'), 'w+') as outf:
@@ -50,11 +63,15 @@ def parse_data():
             for xp in xPoints:
                 w.writerow(xp)
         print("Collecting gw scores")
-        collect_gw(gw_num, player_base_filename, gw_base_filename, base_filename) 
+        collect_gw(gw_num, player_base_filename, gw_base_filename, base_filename, archive)
         print("Merging gw scores")
         merge_gw(gw_num, gw_base_filename)
+        print("Updating form features")
+        update_form_features(season, gw_num)
+        print("Updating team fixtures")
+        update_team_fixtures(season, gw_num)
     understat_filename = base_filename + 'understat'
-    parse_epl_data(understat_filename)
+    refresh_epl_data(understat_filename)
 
 def fixtures(base_filename):
     data = get_fixtures_data()
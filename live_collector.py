@@ -0,0 +1,212 @@
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from getters import get_data, get_fixtures_data, get_live_data
+from collector import get_expected_points, pos_dict
+
+# Columns of a player's gw.csv, in the order the element-summary endpoint
+# produces them (sorted), so live rows line up with collect_gw output
+GW_FIELDNAMES = ['assists', 'bonus', 'bps', 'clean_sheets', 'creativity', 'element',
+                 'expected_assists', 'expected_goal_involvements', 'expected_goals',
+                 'expected_goals_conceded', 'fixture', 'goals_conceded', 'goals_scored',
+                 'ict_index', 'influence', 'kickoff_time', 'minutes', 'opponent_team',
+                 'own_goals', 'penalties_missed', 'penalties_saved', 'red_cards', 'round',
+                 'saves', 'selected', 'starts', 'team_a_score', 'team_h_score', 'threat',
+                 'total_points', 'transfers_balance', 'transfers_in', 'transfers_out',
+                 'value', 'was_home', 'yellow_cards']
+
+# Stats that the live payload only reports as gameweek totals
+AGGREGATE_ONLY_STATS = ['creativity', 'expected_assists', 'expected_goal_involvements',
+                        'expected_goals', 'expected_goals_conceded', 'ict_index',
+                        'influence', 'starts', 'threat']
+
+
+def get_fixture_stat(fixture, identifier, element):
+    """ Look up a single player's value for a stat in a fixture's stats list
+
+    Args:
+        fixture (dict): Fixture as returned by the fixtures endpoint
+        identifier (str): Name of the stat, e.g. 'bps'
+        element (int): ID of the player
+    """
+    for stat in fixture.get('stats') or []:
+        if stat['identifier'] != identifier:
+            continue
+        for side in ['h', 'a']:
+            for entry in stat[side]:
+                if entry['element'] == element:
+                    return entry['value']
+    return 0
+
+
+def build_live_rows(gw, bootstrap, fixtures, live, xPoints):
+    """ Build gameweek rows for every player from a single live payload
+
+    Players with more than one fixture in the gameweek get one row per fixture.
+    Stats that are explained per fixture are split accordingly, while stats that
+    only exist as gameweek totals are put on the player's earliest kickoff so
+    that summing the rows still gives the live totals.
+
+    Args:
+        gw (int): ID of the gameweek
+        bootstrap (dict): bootstrap-static payload
+        fixtures (list): fixtures payload
+        live (dict): event/{gw}/live payload
+        xPoints (dict): Mapping of player id to expected points
+    """
+    teams = {t['id']: t['name'] for t in bootstrap['teams']}
+    players = {e['id']: e for e in bootstrap['elements']}
+    total_players = bootstrap.get('total_players', 0)
+    gw_fixtures = {f['id']: f for f in fixtures if f['event'] == gw}
+    team_fixtures = {}
+    for f in sorted(gw_fixtures.values(), key=lambda f: f['kickoff_time'] or ''):
+        team_fixtures.setdefault(f['team_h'], []).append(f['id'])
+        team_fixtures.setdefault(f['team_a'], []).append(f['id'])
+
+    rows = []
+    for element in live['elements']:
+        id = element['id']
+        if id not in players:
+            continue
+        player = players[id]
+        team = player['team']
+        explained = {e['fixture']: e['stats'] for e in element.get('explain', [])}
+        fixture_ids = sorted([f for f in explained if f in gw_fixtures],
+                             key=lambda f: gw_fixtures[f]['kickoff_time'] or '') or team_fixtures.get(team, [])
+        totals = element['stats']
+        selected = round(float(player['selected_by_percent']) * total_players / 100)
+        for i, fixture_id in enumerate(fixture_ids):
+            fixture = gw_fixtures[fixture_id]
+            if fixture['team_h'] == team:
+                was_home = True
+            elif fixture['team_a'] == team:
+                was_home = False
+            else:
+                # player has changed club since; leave it to the full scrape
+                continue
+            if len(fixture_ids) == 1:
+                stats = dict(totals)
+            else:
+                stats = {k: 0 for k in totals}
+                for s in explained.get(fixture_id, []):
+                    stats[s['identifier']] = s['value']
+                stats['total_points'] = sum(s['points'] for s in explained.get(fixture_id, []))
+                stats['bps'] = get_fixture_stat(fixture, 'bps', id)
+                if i == 0:
+                    for k in AGGREGATE_ONLY_STATS:
+                        if k in totals:
+                            stats[k] = totals[k]
+            row = {k: stats.get(k, 0) for k in GW_FIELDNAMES}
+            row['element'] = id
+            row['fixture'] = fixture_id
+            row['round'] = gw
+            row['kickoff_time'] = fixture['kickoff_time']
+            row['was_home'] = was_home
+            row['opponent_team'] = fixture['team_a'] if was_home else fixture['team_h']
+            row['team_h_score'] = fixture['team_h_score']
+            row['team_a_score'] = fixture['team_a_score']
+            row['value'] = player['now_cost']
+            row['selected'] = selected
+            row['transfers_in'] = player['transfers_in_event']
+            row['transfers_out'] = player['transfers_out_event']
+            row['transfers_balance'] = player['transfers_in_event'] - player['transfers_out_event']
+            row['name'] = player['first_name'] + ' ' + player['second_name']
+            row['position'] = pos_dict[player['element_type']]
+            row['team'] = teams[team]
+            row['xP'] = xPoints.get(id, 0.0)
+            rows += [row]
+    return rows
+
+
+def write_live_gw(gw, rows, output_dir):
+    """ Write the rows of a gameweek with the same columns as collect_gw
+
+    Args:
+        gw (int): ID of the gameweek
+        rows (list): Rows as built by build_live_rows
+        output_dir (str): Directory the gw csv is written to
+    """
+    fieldnames = ['name', 'position', 'team', 'xP'] + GW_FIELDNAMES
+    outf = open(os.path.join(output_dir, "gw" + str(gw) + ".csv"), 'w', encoding="utf-8")
+    writer = csv.DictWriter(outf, fieldnames=fieldnames, lineterminator='\n')
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+    outf.close()
+
+
+def get_live_xpoints(gw, bootstrap, output_dir):
+    """ Expected points for the gameweek, preferring the stored xP file
+    """
+    xPoints = get_expected_points(gw, output_dir)
+    if len(xPoints) == 0:
+        for event in bootstrap['events']:
+            if event['id'] == gw and event['is_current']:
+                xPoints = {e['id']: e['ep_this'] for e in bootstrap['elements']}
+    return xPoints
+
+
+def collect_live_gw(gw, output_dir, bootstrap=None):
+    """ Collect a gameweek from the live endpoint in three requests
+
+    Args:
+        gw (int): ID of the gameweek
+        output_dir (str): Directory the gw csv is written to
+        bootstrap (dict): Already fetched bootstrap-static payload, if any
+    """
+    if bootstrap is None:
+        bootstrap = get_data()
+    fixtures = get_fixtures_data()
+    live = get_live_data(gw)
+    xPoints = get_live_xpoints(gw, bootstrap, output_dir)
+    rows = build_live_rows(gw, bootstrap, fixtures, live, xPoints)
+    write_live_gw(gw, rows, output_dir)
+    return fixtures, live
+
+
+def poll_live_gw(gw, output_dir, interval=120):
+    """ Keep a gameweek's csv up to date while its matches are being played
+
+    The bootstrap data is fetched once; every poll costs two requests and the
+    csv is only rewritten when the live payload has changed. Polling stops once
+    every fixture of the gameweek is finished.
+
+    Args:
+        gw (int): ID of the gameweek
+        output_dir (str): Directory the gw csv is written to
+        interval (int): Number of seconds to wait between polls
+    """
+    bootstrap = get_data()
+    xPoints = get_live_xpoints(gw, bootstrap, output_dir)
+    last_digest = None
+    while True:
+        fixtures = get_fixtures_data()
+        live = get_live_data(gw)
+        digest = hashlib.sha1(json.dumps(live, sort_keys=True).encode('utf-8')).hexdigest()
+        if digest != last_digest:
+            rows = build_live_rows(gw, bootstrap, fixtures, live, xPoints)
+            write_live_gw(gw, rows, output_dir)
+            print("Updated gw" + str(gw) + " with " + str(len(rows)) + " rows")
+            last_digest = digest
+        gw_fixtures = [f for f in fixtures if f['event'] == gw]
+        if all(f['finished'] for f in gw_fixtures):
+            break
+        time.sleep(interval)
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: python live_collector.py <gw> <output_dir> [poll_interval]. Eg: python live_collector.py 5 data/2024-25/gws 120")
+        sys.exit(1)
+    gw = int(sys.argv[1])
+    output_dir = sys.argv[2]
+    if len(sys.argv) == 4:
+        poll_live_gw(gw, output_dir, int(sys.argv[3]))
+    else:
+        collect_live_gw(gw, output_dir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+import csv
+import hashlib
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+MANIFEST_FIELDS = ['path', 'size', 'sha256']
+CACHE_FIELDS = ['path', 'size', 'mtime_ns', 'sha256']
+# Manifest of the files directly inside the data folder
+ROOT_MANIFEST = '_root'
+BLOCK_SIZE = 1 << 20
+
+
+def get_manifests_dir(data_dir='data'):
+    return os.path.join(os.getcwd(), data_dir, 'manifests')
+
+
+def hash_file(path):
+    """ sha256 of a file, read in blocks
+    """
+    h = hashlib.sha256()
+    with open(path, 'rb') as fin:
+        for block in iter(lambda: fin.read(BLOCK_SIZE), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def list_files(data_dir='data'):
+    """ Gets (relative path, size, mtime_ns) of every file of the data tree, manifests excluded
+    """
+    root = os.path.join(os.getcwd(), data_dir)
+    manifests_dir = get_manifests_dir(data_dir)
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        if dirpath == manifests_dir:
+            dirnames[:] = []
+            continue
+        dirnames.sort()
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            stat = os.stat(path)
+            files += [(os.path.relpath(path, root).replace(os.sep, '/'), stat.st_size, stat.st_mtime_ns)]
+    return files
+
+
+def load_cache(data_dir='data'):
+    """ Gets the hash cache as a dict of path -> (size, mtime_ns, sha256)
+    """
+    path = os.path.join(get_manifests_dir(data_dir), 'hash_cache.csv')
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as fin:
+        return {row['path']: (int(row['size']), int(row['mtime_ns']), row['sha256'])
+                for row in csv.DictReader(fin)}
+
+
+def save_cache(cache, data_dir='data'):
+    path = os.path.join(get_manifests_dir(data_dir), 'hash_cache.csv')
+    with open(path, 'w', encoding='utf-8', newline='') as outf:
+        w = csv.writer(outf)
+        w.writerow(CACHE_FIELDS)
+        for file_path in sorted(cache):
+            w.writerow([file_path] + list(cache[file_path]))
+
+
+def get_manifest_name(path):
+    """ Season folder a file belongs to, ROOT_MANIFEST for files outside of one
+    """
+    parts = path.split('/')
+    return parts[0] if len(parts) > 1 else ROOT_MANIFEST
+
+
+def build_manifests(data_dir='data', workers=8):
+    """ Hash the data tree and write one manifest per season folder
+
+    Only files whose size or mtime changed since the last build are hashed
+    again, in parallel; the rest come from the hash cache.
+
+    Args:
+        data_dir (str): Folder to build the manifests of
+        workers (int): Number of files hashed at once
+    """
+    os.makedirs(get_manifests_dir(data_dir), exist_ok=True)
+    root = os.path.join(os.getcwd(), data_dir)
+    cache = load_cache(data_dir)
+    files = list_files(data_dir)
+    stale = [(path, size, mtime) for path, size, mtime in files
+             if cache.get(path, (None, None, None))[:2] != (size, mtime)]
+    with ThreadPoolExecutor(workers) as executor:
+        hashes = executor.map(hash_file, [os.path.join(root, path) for path, _, _ in stale])
+        for (path, size, mtime), sha in zip(stale, hashes):
+            cache[path] = (size, mtime, sha)
+    current = set(path for path, _, _ in files)
+    cache = {path: entry for path, entry in cache.items() if path in current}
+    save_cache(cache, data_dir)
+
+    manifests = {}
+    for path, size, _ in files:
+        manifests.setdefault(get_manifest_name(path), []).append((path, size, cache[path][2]))
+    for name, rows in manifests.items():
+        with open(os.path.join(get_manifests_dir(data_dir), name + '.csv'), 'w', encoding='utf-8', newline='') as outf:
+            w = csv.writer(outf)
+            w.writerow(MANIFEST_FIELDS)
+            w.writerows(rows)
+    print("Hashed " + str(len(stale)) + " of " + str(len(files)) + " files")
+    return manifests
+
+
+def load_manifest(path):
+    """ Gets a manifest as a dict of path -> sha256
+    """
+    with open(path, 'r', encoding='utf-8') as fin:
+        return {row['path']: row['sha256'] for row in csv.DictReader(fin)}
+
+
+def diff_manifests(old, new):
+    """ Files added, changed and removed between two manifests
+
+    Args:
+        old (dict): Manifest as returned by load_manifest
+        new (dict): Manifest as returned by load_manifest
+    """
+    added = sorted(set(new) - set(old))
+    removed = sorted(set(old) - set(new))
+    changed = sorted(path for path in set(old) & set(new) if old[path] != new[path])
+    return added, changed, removed
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'build':
+        build_manifests(sys.argv[2] if len(sys.argv) > 2 else 'data')
+    elif len(sys.argv) == 4 and sys.argv[1] == 'diff':
+        added, changed, removed = diff_manifests(load_manifest(sys.argv[2]), load_manifest(sys.argv[3]))
+        for status, paths in [('A', added), ('M', changed), ('D', removed)]:
+            for path in paths:
+                print(status + ' ' + path)
+    else:
+        print("Usage: python manifest.py build [data_dir]. Eg: python manifest.py build data")
+        print("       python manifest.py diff <old_manifest> <new_manifest>. Eg: python manifest.py diff old/2024-25.csv data/manifests/2024-25.csv")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
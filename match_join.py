@@ -0,0 +1,323 @@
+import csv
+import os
+import re
+import sys
+from collections import Counter
+import pandas as pd
+from season_loader import load_season
+from team_fixtures import add_player_teams, get_team_names
+
+FPL_COLUMNS = ['name', 'element', 'fixture', 'GW', 'kickoff_time', 'was_home', 'opponent_team',
+               'minutes', 'goals_scored', 'assists', 'yellow_cards', 'total_points']
+# understat / fbref column -> column of the joined table
+UNDERSTAT_COLUMNS = {'time': 'us_minutes', 'goals': 'us_goals', 'shots': 'us_shots', 'xG': 'us_xG',
+                     'xA': 'us_xA', 'key_passes': 'us_key_passes', 'npxG': 'us_npxG',
+                     'xGChain': 'us_xGChain', 'xGBuildup': 'us_xGBuildup'}
+FBREF_COLUMNS = {'minutes': 'fb_minutes', 'xg': 'fb_xg', 'xa': 'fb_xa', 'npxg': 'fb_npxg',
+                 'shots_total': 'fb_shots', 'sca': 'fb_sca', 'gca': 'fb_gca', 'touches': 'fb_touches',
+                 'pressures': 'fb_pressures', 'progressive_passes': 'fb_progressive_passes',
+                 'progressive_carries': 'fb_progressive_carries', 'tackles': 'fb_tackles',
+                 'interceptions': 'fb_interceptions'}
+
+# Team names of understat and fbref -> FPL team name, for the names that differ
+TEAM_ALIASES = {
+    'manchester united': 'man utd', 'manchester utd': 'man utd', 'manchester city': 'man city',
+    'tottenham': 'spurs', 'tottenham hotspur': 'spurs', 'newcastle united': 'newcastle',
+    'newcastle utd': 'newcastle', 'wolverhampton wanderers': 'wolves',
+    'west bromwich albion': 'west brom', 'sheffield united': 'sheffield utd',
+    'nottingham forest': "nott'm forest", "nott'ham forest": "nott'm forest",
+    'brighton and hove albion': 'brighton', 'west ham united': 'west ham',
+    'afc bournemouth': 'bournemouth', 'leeds united': 'leeds', 'leicester city': 'leicester',
+    'norwich city': 'norwich', 'luton town': 'luton', 'ipswich town': 'ipswich',
+    'cardiff city': 'cardiff', 'huddersfield town': 'huddersfield', 'swansea city': 'swansea',
+    'stoke city': 'stoke', 'hull city': 'hull',
+}
+
+
+def normalize_team(name):
+    name = str(name).strip().lower().replace('&', 'and')
+    return TEAM_ALIASES.get(name, name)
+
+
+def get_joined_path(season, data_dir='data'):
+    return os.path.join(os.getcwd(), data_dir, season, 'joined_matches.csv')
+
+
+def load_fpl_rows(season, data_dir='data'):
+    """ Gameweek rows of a season with their team name and match date
+    """
+    df = load_season(season, FPL_COLUMNS, data_dir)
+    df = add_player_teams(df[df['fixture'].notnull()]).reset_index(drop=True)
+    names = get_team_names(season, data_dir)
+    df.insert(2, 'team_name', df['team'].map(names))
+    df.insert(3, 'opponent_name', df['opponent_team'].map(names))
+    df['date'] = df['kickoff_time'].str[:10]
+    return df
+
+
+def build_indexes(fpl):
+    """ Hash indexes of the FPL rows
+
+    Returns (date, team) -> fixture, (element, fixture) -> row and
+    (fixture, team, minutes, goals, assists) -> rows, the last one to find the
+    candidates of a stat line that carries no player id.
+    """
+    by_team = {}
+    by_player = {}
+    by_stats = {}
+    columns = [fpl[c].tolist() for c in ['date', 'team_name', 'fixture', 'element', 'minutes',
+                                          'goals_scored', 'assists']]
+    for row, (date, team, fixture, element, minutes, goals, assists) in enumerate(zip(*columns)):
+        team = normalize_team(team)
+        by_team[(date, team)] = fixture
+        by_player[(element, fixture)] = row
+        by_stats.setdefault((fixture, team, minutes, goals, assists), []).append(row)
+    return by_team, by_player, by_stats
+
+
+def load_understat_ids(season, data_dir='data'):
+    """ Gets the understat -> FPL player id mapping of a season
+
+    id_dict.csv is used when the season has one, otherwise players are
+    paired by name like understat.match_ids does.
+    """
+    season_dir = os.path.join(data_dir, season)
+    path = os.path.join(season_dir, 'id_dict.csv')
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as fin:
+            reader = csv.reader(fin)
+            header = [h.strip() for h in next(reader)]
+            pairs = [(row[header.index('Understat_ID')], row[header.index('FPL_ID')]) for row in reader]
+    else:
+        from understat import get_player_ids
+        pairs = [(p.us_id, p.fpl_id) for p in get_player_ids(os.path.join(season_dir, 'understat'), season_dir)]
+    return {int(us_id): int(fpl_id) for us_id, fpl_id in pairs if int(fpl_id) > 0 and int(us_id) > 0}
+
+
+def to_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+def to_int(value):
+    """ Integer of a count, where fbref leaves the minutes of unused substitutes empty
+    """
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def get_candidates(by_stats, fixture, team, minutes, goals, assists):
+    """ Rows of a fixture and team with the same goals and assists and minutes within one
+
+    FPL and the other sources round the minute of a substitution differently.
+    """
+    rows = []
+    for m in [minutes - 1, minutes, minutes + 1]:
+        rows += by_stats.get((fixture, team, m, goals, assists), [])
+    return rows
+
+
+def pick_element(votes, num_played):
+    """ Element voted for by at least half of the played matches and more than any other, or None
+    """
+    ranked = votes.most_common(2)
+    if len(ranked) == 0 or ranked[0][1] * 2 < num_played:
+        return None
+    if len(ranked) == 2 and ranked[0][1] == ranked[1][1]:
+        return None
+    return ranked[0][0]
+
+
+def identify(rows, teams, by_stats, elements, minutes_column):
+    """ Element of a player without an FPL id, from the stat lines of the matches he played
+
+    Every played match votes for the players of its fixture whose minutes,
+    goals and assists agree with his.
+
+    Args:
+        rows (list): (fixture, row) pairs of the player's matches
+        teams (list): Normalized teams the player may have played for in each match
+        by_stats (dict): Stat line index as returned by build_indexes
+        elements (list): Element of every FPL row
+        minutes_column (str): Column of the rows holding the minutes played
+    """
+    votes = Counter()
+    num_played = 0
+    for (fixture, row), candidate_teams in zip(rows, teams):
+        minutes = to_int(row[minutes_column])
+        if minutes == 0:
+            continue
+        num_played += 1
+        found = set()
+        for team in candidate_teams:
+            found |= set(elements[i] for i in get_candidates(by_stats, fixture, team, minutes,
+                                                               to_int(row['goals']), to_int(row['assists'])))
+        votes.update(found)
+    return pick_element(votes, num_played)
+
+
+def fill_rows(joined, rows, element, source_id, id_column, columns, by_player):
+    """ Copy the columns of a player's matches into the joined columns, returns how many were joined
+    """
+    num_joined = 0
+    for fixture, row in rows:
+        i = by_player.get((element, fixture))
+        if i is None:
+            continue
+        num_joined += 1
+        joined[id_column][i] = source_id
+        for c, name in columns.items():
+            joined[name][i] = to_number(row[c])
+    return num_joined
+
+
+def join_understat(season, fpl, by_team, by_player, by_stats, data_dir='data'):
+    """ Match every understat player match of a season to its FPL row
+
+    Players are mapped to FPL ids with id_dict.csv or their names; those
+    left unmapped are identified from their stat lines.
+
+    Returns the understat columns aligned to the FPL rows and the counts of
+    rows read, rows whose match was found, rows joined to a player and
+    players identified from their stat lines.
+    """
+    understat_dir = os.path.join(data_dir, season, 'understat')
+    joined = {c: [float('nan')] * len(fpl) for c in ['understat_id'] + list(UNDERSTAT_COLUMNS.values())}
+    counts = Counter()
+    if not os.path.isdir(understat_dir):
+        return joined, counts
+    ids = load_understat_ids(season, data_dir)
+    elements = fpl['element'].tolist()
+    for filename in sorted(os.listdir(understat_dir)):
+        match = re.match(r'.*_(\d+)\.csv$', filename)
+        if match is None or filename.startswith('understat_'):
+            continue
+        us_id = int(match.group(1))
+        rows = []
+        teams = []
+        with open(os.path.join(understat_dir, filename), 'r', encoding='utf-8') as fin:
+            for row in csv.DictReader(fin):
+                if row['season'] != season[:4]:
+                    continue
+                counts['rows'] += 1
+                home = normalize_team(row['h_team'])
+                away = normalize_team(row['a_team'])
+                fixture = by_team.get((row['date'], home), by_team.get((row['date'], away)))
+                if fixture is None:
+                    continue
+                counts['fixture'] += 1
+                rows += [(fixture, row)]
+                teams += [(home, away)]
+        element = ids.get(us_id)
+        if element is None:
+            element = identify(rows, teams, by_stats, elements, 'time')
+            if element is None:
+                continue
+            counts['identified'] += 1
+        counts['joined'] += fill_rows(joined, rows, element, us_id, 'understat_id', UNDERSTAT_COLUMNS, by_player)
+    return joined, counts
+
+
+def join_fbref(season, fpl, by_team, by_player, by_stats, data_dir='data'):
+    """ Match every fbref Premier League match log row of a season to its FPL row
+
+    fbref players carry no FPL id, so every one of them is identified from
+    his stat lines.
+
+    Returns the fbref columns aligned to the FPL rows and the counts of rows
+    read, rows whose match was found, rows joined to a player and players
+    identified.
+    """
+    fbref_dir = os.path.join(data_dir, season, 'fbref')
+    joined = {c: [float('nan')] * len(fpl) for c in ['fbref_id'] + list(FBREF_COLUMNS.values())}
+    counts = Counter()
+    if not os.path.isdir(fbref_dir):
+        return joined, counts
+    elements = fpl['element'].tolist()
+    for filename in sorted(os.listdir(fbref_dir)):
+        if not filename.endswith('.csv'):
+            continue
+        fbref_id = filename[:-len('.csv')]
+        rows = []
+        teams = []
+        with open(os.path.join(fbref_dir, filename), 'r', encoding='utf-8') as fin:
+            for row in csv.DictReader(fin):
+                if row['comp'] != 'Premier League':
+                    continue
+                counts['rows'] += 1
+                team = normalize_team(row['squad'])
+                fixture = by_team.get((row['date'], team))
+                if fixture is None:
+                    continue
+                counts['fixture'] += 1
+                rows += [(fixture, row)]
+                teams += [(team,)]
+        element = identify(rows, teams, by_stats, elements, 'minutes')
+        if element is None:
+            continue
+        counts['identified'] += 1
+        counts['joined'] += fill_rows(joined, rows, element, fbref_id, 'fbref_id', FBREF_COLUMNS, by_player)
+    return joined, counts
+
+
+def get_rate(count, total):
+    return round(count / total, 4) if total else 0.0
+
+
+def join_season(season, data_dir='data'):
+    """ Join a season's FPL, understat and fbref rows into one row per player and match
+
+    Each source is read once; its rows find their FPL row through hash
+    indexes on (date, team) and (element, fixture). The table is written to
+    joined_matches.csv in the season folder.
+
+    Args:
+        season (str): Name of the season folder, e.g. '2021-22'
+        data_dir (str): Folder containing the season folders
+
+    Returns the diagnostics as a dict of source -> counts and match rates.
+    """
+    fpl = load_fpl_rows(season, data_dir)
+    by_team, by_player, by_stats = build_indexes(fpl)
+    understat, us_counts = join_understat(season, fpl, by_team, by_player, by_stats, data_dir)
+    fbref, fb_counts = join_fbref(season, fpl, by_team, by_player, by_stats, data_dir)
+    joined = pd.concat([fpl.drop(columns=['date', 'home']), pd.DataFrame(understat), pd.DataFrame(fbref)], axis=1)
+    joined.to_csv(get_joined_path(season, data_dir), index=False)
+
+    played = (fpl['minutes'].fillna(0) > 0).to_numpy()
+    diagnostics = {'fpl': {'rows': len(fpl), 'played': int(played.sum())}}
+    for source, counts, id_column in [('understat', us_counts, 'understat_id'), ('fbref', fb_counts, 'fbref_id')]:
+        matched = joined[id_column].notnull().to_numpy()
+        diagnostics[source] = dict(counts)
+        diagnostics[source]['fixture_rate'] = get_rate(counts['fixture'], counts['rows'])
+        diagnostics[source]['join_rate'] = get_rate(counts['joined'], counts['rows'])
+        diagnostics[source]['fpl_played_rate'] = get_rate(int((matched & played).sum()), int(played.sum()))
+    return diagnostics
+
+
+def print_diagnostics(season, diagnostics):
+    print(season + ": " + str(diagnostics['fpl']['rows']) + " FPL rows, "
+          + str(diagnostics['fpl']['played']) + " with minutes")
+    for source in ['understat', 'fbref']:
+        d = diagnostics[source]
+        if d.get('rows', 0) == 0:
+            print("  " + source.ljust(10) + "no data")
+            continue
+        print("  " + source.ljust(10) + str(d['rows']) + " rows, " + str(d['fixture_rate'] * 100)[:5]
+              + "% matched to a fixture, " + str(d['join_rate'] * 100)[:5] + "% to a player, covering "
+              + str(d['fpl_played_rate'] * 100)[:5] + "% of FPL rows with minutes")
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python match_join.py <season> [...]. Eg: python match_join.py 2021-22 2022-23")
+        sys.exit(1)
+    for season in sys.argv[1:]:
+        print_diagnostics(season, join_season(season))
+
+if __name__ == '__main__':
+    main()
@@ -23,18 +23,23 @@ def clean_players_name_string(df, col='name'):
     #replace _ with space in name column
     df[col] = df[col].str.replace('_', ' ')
     #remove number in name column
-    df[col] = df[col].str.replace('\d+', '')
+    df[col] = df[col].str.replace('\d+', '', regex=True)
     #trim name column
     df[col] = df[col].str.strip()
     return df
 
-def filter_players_exist_latest(df, col='position'):
+def filter_players_exist_latest(df, col='position', key='name'):
     """ Fill in null 'position' (data that only available in 20-21 season) into previous seasons. 
         Null meaning that player doesnt exist in latest season hence can exclude.
+
+    Args:
+        df: merged df for all the seasons that have been imported
+        col: name of the column to fill
+        key: column identifying a player across seasons, e.g. 'player_id'
     """
 
-    result = df.groupby('name')[col].apply(lambda x: x.ffill().bfill())
-    df[col] = result.droplevel(0)
+    filled = df.groupby(key)[col].ffill()
+    df[col] = filled.groupby(df[key]).bfill()
     df = df[df[col].notnull()]
     return df
 
@@ -58,15 +63,21 @@ def get_opponent_team_name(df):
     df = df.rename(columns={"team_name": "opp_team_name"})
     return df
 
-def export_cleaned_data(df):
+def get_cleaned_data_path():
+    path = os.getcwd()
+    filename = 'cleaned_merged_seasons.csv'
+    return join(dirname(dirname("__file__")), path, 'data', filename)
+
+def export_cleaned_data(df, append=False):
     """ Function to export merged df into specified folder
     Args:
-        path (str): Path of the folder
-        filename(str): Name of the file
+        df: merged df to export
+        append (bool): Append to the file without a header instead of overwriting it
     """
 
-    path = os.getcwd()
-    filename = 'cleaned_merged_seasons.csv'
-    filepath = join(dirname(dirname("__file__")), path, 'data', filename)
-    df.to_csv(filepath, encoding = 'utf-8', index=False)
+    filepath = get_cleaned_data_path()
+    if append:
+        df.to_csv(filepath, encoding = 'utf-8', index=False, mode='a', header=False)
+    else:
+        df.to_csv(filepath, encoding = 'utf-8', index=False)
     return df
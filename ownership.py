@@ -0,0 +1,155 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# Number of most owned players that make up a gameweek's template squad
+TEMPLATE_SIZE = 15
+
+
+def get_managers_dir(season, data_dir='data'):
+    return os.path.join(os.getcwd(), data_dir, season, 'managers')
+
+
+def load_picks(season, data_dir='data'):
+    """ Load top_managers_gwPicks.csv with the element id in an 'element' column
+    """
+    picks = pd.read_csv(os.path.join(get_managers_dir(season, data_dir), 'top_managers_gwPicks.csv'))
+    # the raw file written before formatting calls the element 'id'
+    return picks.rename(columns={'player_id': 'element', 'id': 'element'})
+
+
+def build_incidence(picks):
+    """ Sparse manager x player incidence of every gameweek, in coordinate form
+
+    Returns the gameweek, manager and player index of every pick with its
+    multiplier as the value, and the gameweeks, managers and elements the
+    indices refer to.
+
+    Args:
+        picks: df of picks with team_id, gw, element and multiplier columns
+    """
+    gws, gw_index = np.unique(picks['gw'].to_numpy(), return_inverse=True)
+    managers, manager_index = np.unique(picks['team_id'].to_numpy(), return_inverse=True)
+    elements, element_index = np.unique(picks['element'].to_numpy(), return_inverse=True)
+    return {'gw': gw_index, 'manager': manager_index, 'player': element_index,
+            'multiplier': picks['multiplier'].to_numpy(), 'gws': gws,
+            'managers': managers, 'elements': elements}
+
+
+def aggregate_ownership(incidence):
+    """ Ownership, captain share and effective ownership of every player in every gameweek
+
+    Every statistic is a weighted count of the incidence entries per
+    (gameweek, player) cell, so all gameweeks come out of one bincount each.
+    Shares are relative to the number of managers with picks in the gameweek.
+
+    Args:
+        incidence (dict): Incidence as returned by build_incidence
+    """
+    num_gws = len(incidence['gws'])
+    num_players = len(incidence['elements'])
+    cell = incidence['gw'] * num_players + incidence['player']
+    multiplier = incidence['multiplier']
+
+    def per_cell(weights):
+        return np.bincount(cell, weights, minlength=num_gws * num_players).reshape(num_gws, num_players)
+
+    # every (gw, manager) pair counted once
+    pairs = np.unique(incidence['gw'] * len(incidence['managers']) + incidence['manager'])
+    num_managers = np.bincount(pairs // len(incidence['managers']), minlength=num_gws)[:, None]
+    owned = per_cell(None)
+    captained = per_cell((multiplier >= 2).astype(float))
+    eo = per_cell(multiplier.astype(float))
+
+    gw, player = np.nonzero(owned)
+    return pd.DataFrame({'gw': incidence['gws'][gw], 'element': incidence['elements'][player],
+                         'ownership': (owned / num_managers)[gw, player],
+                         'captain_share': (captained / num_managers)[gw, player],
+                         'eo': (eo / num_managers)[gw, player]})
+
+
+def template_overlap(incidence, stats):
+    """ How close every manager's squad is to each gameweek's template
+
+    The template is the TEMPLATE_SIZE most owned players of the gameweek.
+    'template_overlap' is the number of a manager's picks in it, and
+    'mean_ownership' the average ownership of his picks.
+
+    Args:
+        incidence (dict): Incidence as returned by build_incidence
+        stats: df as returned by aggregate_ownership for the same incidence
+    """
+    num_players = len(incidence['elements'])
+    num_managers = len(incidence['managers'])
+    gw_index = np.searchsorted(incidence['gws'], stats['gw'].to_numpy())
+    player_index = np.searchsorted(incidence['elements'], stats['element'].to_numpy())
+    ownership = np.zeros((len(incidence['gws']), num_players))
+    ownership[gw_index, player_index] = stats['ownership'].to_numpy()
+    # rank of every player within his gameweek by ownership, most owned first
+    order = np.argsort(-ownership, axis=1, kind='stable')
+    in_template = np.zeros(ownership.shape, dtype=bool)
+    np.put_along_axis(in_template, order[:, :TEMPLATE_SIZE], True, axis=1)
+    in_template &= ownership > 0
+
+    pick_gw = incidence['gw']
+    pick_player = incidence['player']
+    row = pick_gw * num_managers + incidence['manager']
+    size = len(incidence['gws']) * num_managers
+    picks = np.bincount(row, minlength=size)
+    overlap = np.bincount(row, in_template[pick_gw, pick_player], minlength=size)
+    total_ownership = np.bincount(row, ownership[pick_gw, pick_player], minlength=size)
+    present = np.nonzero(picks)[0]
+    return pd.DataFrame({'gw': incidence['gws'][present // num_managers],
+                         'team_id': incidence['managers'][present % num_managers],
+                         'template_overlap': overlap[present].astype(int),
+                         'mean_ownership': total_ownership[present] / picks[present]})
+
+
+def write_or_append(df, path):
+    if os.path.exists(path):
+        df.to_csv(path, mode='a', header=False, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def update_ownership(season, data_dir='data'):
+    """ Compute the ownership and template overlap of the gameweeks not computed yet
+
+    Gameweeks are independent of each other, so only the picks of gameweeks
+    missing from ownership.csv are aggregated and appended.
+
+    Args:
+        season (str): Name of the season folder, e.g. '2019-20'
+        data_dir (str): Folder containing the season folders
+    """
+    managers_dir = get_managers_dir(season, data_dir)
+    ownership_path = os.path.join(managers_dir, 'ownership.csv')
+    overlap_path = os.path.join(managers_dir, 'template_overlap.csv')
+    picks = load_picks(season, data_dir)
+    if os.path.exists(ownership_path):
+        done = pd.read_csv(ownership_path, usecols=['gw'])['gw'].unique()
+        picks = picks[~picks['gw'].isin(done)]
+    if len(picks) == 0:
+        print(season + " ownership is up to date")
+        return None
+    incidence = build_incidence(picks)
+    stats = aggregate_ownership(incidence)
+    names = picks.drop_duplicates('element').set_index('element')
+    if 'second_name' in names:
+        stats.insert(2, 'second_name', stats['element'].map(names['second_name']))
+    write_or_append(stats, ownership_path)
+    write_or_append(template_overlap(incidence, stats), overlap_path)
+    return stats
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python ownership.py <season>. Eg: python ownership.py 2019-20")
+        sys.exit(1)
+    stats = update_ownership(sys.argv[1])
+    if stats is not None:
+        print("Aggregated " + str(stats['gw'].nunique()) + " gameweeks")
+
+if __name__ == '__main__':
+    main()
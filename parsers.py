@@ -1,4 +1,5 @@
 import csv 
+import io
 import os
 from utility import uprint
 import pandas as pd
@@ -41,27 +42,33 @@ def parse_players(list_of_players, base_filename):
     for player in list_of_players:
             w.writerow({k:str(v).encode('utf-8').decode('utf-8') for k, v in player.items()})
 
+def format_stats(list_of_stats):
+    """ CSV text of a list of stats, one column per stat in sorted order
+
+    Args:
+        list_of_stats (list): Non-empty list of dicts of stats
+    """
+    stat_names = extract_stat_names(list_of_stats[0])
+    f = io.StringIO(newline='')
+    w = csv.DictWriter(f, sorted(stat_names))
+    w.writeheader()
+    for stats in list_of_stats:
+        w.writerow(stats)
+    return f.getvalue()
+
 def parse_player_history(list_of_histories, base_filename, player_name, Id):
     if len(list_of_histories) > 0:
-        stat_names = extract_stat_names(list_of_histories[0])
         filename = base_filename + player_name + '_' + str(Id) + '/history.csv'
         os.makedirs(os.path.dirname(filename), exist_ok=True)
-        f = open(filename, 'w+', encoding='utf8', newline='')
-        w = csv.DictWriter(f, sorted(stat_names))
-        w.writeheader()
-        for history in list_of_histories:
-            w.writerow(history)
+        with open(filename, 'w+', encoding='utf8', newline='') as f:
+            f.write(format_stats(list_of_histories))
 
 def parse_player_gw_history(list_of_gw, base_filename, player_name, Id):
     if len(list_of_gw) > 0:
-        stat_names = extract_stat_names(list_of_gw[0])
         filename = base_filename + player_name + '_' + str(Id) + '/gw.csv'
         os.makedirs(os.path.dirname(filename), exist_ok=True)
-        f = open(filename, 'w+', encoding='utf8', newline='')
-        w = csv.DictWriter(f, sorted(stat_names))
-        w.writeheader()
-        for gw in list_of_gw:
-            w.writerow(gw)
+        with open(filename, 'w+', encoding='utf8', newline='') as f:
+            f.write(format_stats(list_of_gw))
 
 def parse_gw_entry_history(data, outfile_base):
     for gw in data:
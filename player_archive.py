@@ -0,0 +1,188 @@
+import csv
+import io
+import json
+import os
+import re
+import struct
+import sys
+import zlib
+
+ARCHIVE_FILENAME = 'players.pack'
+MAGIC = b'FPLPACK1'
+# magic, offset and length of the index
+HEADER = struct.Struct('<8sQQ')
+PLAYER_FILES = ['gw.csv', 'history.csv']
+
+
+def get_element(folder, gw_bytes):
+    """ Element id of a player folder, from its name or else from its gw.csv rows
+
+    Folders of the 2016-17 to 2018-19 seasons are named without the id.
+    """
+    match = re.match(r'.+_(\d+)$', folder)
+    if match:
+        return int(match.group(1))
+    if gw_bytes:
+        rows = csv.DictReader(io.StringIO(decode(gw_bytes)))
+        for row in rows:
+            return int(row['element'])
+    return None
+
+
+def decode(data):
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return data.decode('latin-1')
+
+
+class ArchiveWriter:
+    """ Writes an archive one player at a time, the index is written on close
+
+    The archive is written to a temporary file and only replaces an existing
+    one once it is complete.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.outf = open(path + '.tmp', 'wb')
+        self.outf.write(HEADER.pack(MAGIC, 0, 0))
+        self.index = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        if exc_type is None:
+            self.close()
+        else:
+            self.outf.close()
+            os.remove(self.path + '.tmp')
+
+    def add(self, folder, contents):
+        """ Add the files of a player
+
+        Args:
+            folder (str): Name of the player's folder, e.g. 'Mohamed_Salah_328'
+            contents (dict): Filename -> bytes of the file, e.g. {'gw.csv': b'...'}
+        """
+        entry = {'folder': folder, 'files': {}}
+        for filename, data in contents.items():
+            packed = zlib.compress(data)
+            entry['files'][filename] = [self.outf.tell(), len(packed)]
+            self.outf.write(packed)
+        entry['element'] = get_element(folder, contents.get('gw.csv'))
+        self.index += [entry]
+
+    def close(self):
+        index_bytes = json.dumps(self.index).encode('utf-8')
+        index_offset = self.outf.tell()
+        self.outf.write(index_bytes)
+        self.outf.seek(0)
+        self.outf.write(HEADER.pack(MAGIC, index_offset, len(index_bytes)))
+        self.outf.close()
+        os.replace(self.path + '.tmp', self.path)
+
+
+def pack_season(base_filename):
+    """ Pack every player's gw.csv and history.csv of a season into one file
+
+    The files are stored byte for byte (zlib compressed) after a fixed header,
+    followed by a JSON index of element -> folder and (offset, length) of each
+    file, so any player can be read with a single seek.
+
+    Args:
+        base_filename (str): Season folder containing the players folder, e.g. 'data/2024-25/'
+    """
+    players_dir = os.path.join(base_filename, 'players')
+    archive_path = os.path.join(base_filename, ARCHIVE_FILENAME)
+    with ArchiveWriter(archive_path) as archive:
+        for folder in sorted(os.listdir(players_dir)):
+            contents = {}
+            for filename in PLAYER_FILES:
+                path = os.path.join(players_dir, folder, filename)
+                if os.path.exists(path):
+                    with open(path, 'rb') as fin:
+                        contents[filename] = fin.read()
+            archive.add(folder, contents)
+    return archive_path
+
+
+class PlayerArchive:
+    """ Lazy reader of a packed season; only the index is read when opened
+    """
+
+    def __init__(self, path):
+        self.fin = open(path, 'rb')
+        magic, index_offset, index_length = HEADER.unpack(self.fin.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(path + " is not a player archive")
+        self.fin.seek(index_offset)
+        self.entries = json.loads(self.fin.read(index_length).decode('utf-8'))
+        self.by_element = {e['element']: e for e in self.entries if e['element'] is not None}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.fin.close()
+
+    def elements(self):
+        return sorted(self.by_element)
+
+    def folder(self, element):
+        return self.by_element[element]['folder']
+
+    def read_bytes(self, entry, filename='gw.csv'):
+        """ Original bytes of one of a player's files, None if he does not have it
+        """
+        if filename not in entry['files']:
+            return None
+        offset, length = entry['files'][filename]
+        self.fin.seek(offset)
+        return zlib.decompress(self.fin.read(length))
+
+    def read_rows(self, element, filename='gw.csv'):
+        """ Rows of one of a player's files as dicts, like csv.DictReader gives them
+
+        Args:
+            element (int): Element id of the player
+            filename (str): 'gw.csv' or 'history.csv'
+        """
+        data = self.read_bytes(self.by_element[element], filename)
+        if data is None:
+            return []
+        return list(csv.DictReader(io.StringIO(decode(data))))
+
+
+def export_players(archive_path, output_dir):
+    """ Write the per-player folder layout back out of an archive
+
+    Args:
+        archive_path (str): Path of the players.pack file
+        output_dir (str): Folder to write the player folders into
+    """
+    with PlayerArchive(archive_path) as archive:
+        for entry in archive.entries:
+            folder = os.path.join(output_dir, entry['folder'])
+            os.makedirs(folder, exist_ok=True)
+            for filename in entry['files']:
+                with open(os.path.join(folder, filename), 'wb') as outf:
+                    outf.write(archive.read_bytes(entry, filename))
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == 'pack':
+        print("Wrote " + pack_season(sys.argv[2]))
+    elif len(sys.argv) == 4 and sys.argv[1] == 'export':
+        export_players(sys.argv[2], sys.argv[3])
+    else:
+        print("Usage: python player_archive.py pack <season_folder>. Eg: python player_archive.py pack data/2024-25/")
+        print("       python player_archive.py export <archive> <output_dir>. Eg: python player_archive.py export data/2024-25/players.pack players/")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
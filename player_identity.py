@@ -0,0 +1,150 @@
+import csv
+import os
+import re
+import pandas as pd
+from season_loader import SEASON_SCHEMAS, detect_encoding
+
+IDENTITY_FIELDS = ['player_id', 'season', 'element', 'code', 'first_name', 'second_name']
+
+
+def get_identity_path(data_dir='data'):
+    return os.path.join(os.getcwd(), data_dir, 'player_identity.csv')
+
+
+def read_season_players(season, data_dir='data'):
+    """ Gets the players of a season as a dict of element -> (code, first name, second name)
+
+    players_raw.csv gives the stable 'code' of each player, player_idlist.csv and the
+    players folder fill in any element that is missing from it.
+
+    Args:
+        season (str): Name of the season folder, e.g. '2023-24'
+        data_dir (str): Folder containing the season folders
+    """
+    season_dir = os.path.join(os.getcwd(), data_dir, season)
+    players = {}
+    raw_path = os.path.join(season_dir, 'players_raw.csv')
+    if os.path.exists(raw_path):
+        with open(raw_path, 'r', encoding=detect_encoding(raw_path)) as fin:
+            for row in csv.DictReader(fin):
+                players[int(row['id'])] = (int(row['code']), row['first_name'], row['second_name'])
+    idlist_path = os.path.join(season_dir, 'player_idlist.csv')
+    if os.path.exists(idlist_path):
+        with open(idlist_path, 'r', encoding=detect_encoding(idlist_path)) as fin:
+            for row in csv.DictReader(fin):
+                if int(row['id']) not in players:
+                    players[int(row['id'])] = (None, row['first_name'], row['second_name'])
+    players_dir = os.path.join(season_dir, 'players')
+    if os.path.isdir(players_dir):
+        for folder in os.listdir(players_dir):
+            match = re.match(r'(.+?)_(.+)_(\d+)$', folder)
+            if match and int(match.group(3)) not in players:
+                players[int(match.group(3))] = (None, match.group(1), match.group(2))
+    return players
+
+
+def load_identity_table(data_dir='data'):
+    """ Load the identity table as a list of rows, empty if it does not exist yet
+    """
+    path = get_identity_path(data_dir)
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as fin:
+        return list(csv.DictReader(fin))
+
+
+def build_identity_table(seasons=None, data_dir='data'):
+    """ Assign a stable player id to every (season, element) and persist the table
+
+    Players are matched across seasons on their FPL 'code'. Ids already in the
+    table are kept, so rebuilding after a new season only adds rows. A missing
+    table is first built over every season of the schema registry.
+
+    Args:
+        seasons (list): Seasons to include, every season in the schema registry when None
+        data_dir (str): Folder containing the season folders
+    """
+    if seasons is None:
+        seasons = list(SEASON_SCHEMAS)
+    rows = load_identity_table(data_dir)
+    if len(rows) == 0:
+        # ids are numbered in build order, so a new table always starts from
+        # every season in chronological order to give the same ids everywhere
+        seasons = sorted(set(SEASON_SCHEMAS) | set(seasons))
+    code_index = {}
+    known = set()
+    next_id = 1
+    for row in rows:
+        player_id = int(row['player_id'])
+        if row['code'] != '':
+            code_index[int(row['code'])] = player_id
+        known.add((row['season'], int(row['element'])))
+        next_id = max(next_id, player_id + 1)
+
+    for season in seasons:
+        for element, (code, first_name, second_name) in sorted(read_season_players(season, data_dir).items()):
+            if (season, element) in known:
+                continue
+            if code is not None and code in code_index:
+                player_id = code_index[code]
+            else:
+                player_id = next_id
+                next_id += 1
+                if code is not None:
+                    code_index[code] = player_id
+            rows += [{'player_id': player_id, 'season': season, 'element': element,
+                      'code': '' if code is None else code,
+                      'first_name': first_name, 'second_name': second_name}]
+            known.add((season, element))
+
+    with open(get_identity_path(data_dir), 'w', encoding='utf-8', newline='') as outf:
+        w = csv.DictWriter(outf, IDENTITY_FIELDS)
+        w.writeheader()
+        for row in rows:
+            w.writerow(row)
+    return rows
+
+
+def get_player_id_index(data_dir='data'):
+    """ Gets the hash index of (season, element) -> player id
+    """
+    rows = load_identity_table(data_dir)
+    return {(row['season'], int(row['element'])): int(row['player_id']) for row in rows}
+
+
+def add_player_ids(df, data_dir='data'):
+    """ Add a 'player_id' column to a df with 'season' and 'element' columns
+
+    The identity table is extended with the seasons of any (season, element)
+    it does not know yet, e.g. a new signing or a new season, so ids are
+    assigned on first use.
+
+    Args:
+        df: df of gameweek rows from one or more seasons
+        data_dir (str): Folder containing the season folders
+    """
+    index = get_player_id_index(data_dir)
+    keys = df[['season', 'element']].drop_duplicates()
+    missing = [(season, int(element)) for season, element in zip(keys['season'], keys['element'])
+               if (season, int(element)) not in index]
+    if len(missing) > 0:
+        build_identity_table(sorted(set(season for season, _ in missing)), data_dir)
+        index = get_player_id_index(data_dir)
+        missing = [key for key in missing if key not in index]
+        if len(missing) > 0:
+            raise ValueError(str(len(missing)) + " (season, element) pairs are in no players list, e.g. "
+                             + str(missing[:5]))
+    ids = pd.DataFrame({'season': [k[0] for k in index],
+                        'element': pd.array([k[1] for k in index], dtype=df['element'].dtype),
+                        'player_id': list(index.values())})
+    df = df.merge(ids, on=['season', 'element'], how='left')
+    df['player_id'] = df['player_id'].astype('int32')
+    return df
+
+
+def main():
+    rows = build_identity_table()
+    print(str(len(set(row['player_id'] for row in rows))) + " players over " + str(len(rows)) + " season entries")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+import csv
+import json
+import os
+import sys
+from datetime import datetime
+import pandas as pd
+
+HISTORY_FIELDS = ['timestamp', 'element', 'field', 'value']
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+# Fields of bootstrap-static whose changes are recorded, leaving out noisy
+# derived ones such as form and ep_next
+TRACKED_FIELDS = ['now_cost', 'cost_change_event', 'transfers_in_event', 'transfers_out_event',
+                  'selected_by_percent', 'status', 'news', 'chance_of_playing_next_round',
+                  'chance_of_playing_this_round']
+
+
+def get_history_path(base_filename):
+    return os.path.join(base_filename, 'price_history.csv')
+
+
+def get_state_path(base_filename):
+    return os.path.join(base_filename, 'price_state.json')
+
+
+def to_values(elements):
+    """ Gets the tracked fields of the elements of bootstrap-static as a dict of element -> {field: value}
+
+    Values are kept as the strings players_raw.csv stores.
+    """
+    return {str(e['id']): {k: str(e[k]) for k in TRACKED_FIELDS if k in e} for e in elements}
+
+
+def load_latest(base_filename):
+    """ Latest recorded state of every element, rebuilt from the history without a state file
+    """
+    state_path = get_state_path(base_filename)
+    if os.path.exists(state_path):
+        with open(state_path, 'r', encoding='utf-8') as fin:
+            return json.load(fin)
+    if not os.path.exists(get_history_path(base_filename)):
+        return {}
+    state = get_state_at(base_filename)
+    return {str(element): {k: v for k, v in row.items() if not pd.isnull(v)}
+            for element, row in state.to_dict('index').items()}
+
+
+def record_snapshot(elements, base_filename, now=None):
+    """ Append the tracked fields of every element that changed since the last snapshot
+
+    The first snapshot records every tracked field, later ones only what
+    changed. Between price changes most rows of a poll are transfer counts and
+    ownership moves, which change for many players every hour.
+
+    Args:
+        elements (list): 'elements' of the bootstrap-static data
+        base_filename (str): Season folder, e.g. 'data/2024-25/'
+        now (datetime): Time of the snapshot, the current UTC time when None
+    """
+    if now is None:
+        now = datetime.utcnow()
+    timestamp = now.strftime(TIMESTAMP_FORMAT)
+    previous = load_latest(base_filename)
+    current = to_values(elements)
+    deltas = []
+    for element, values in current.items():
+        old = previous.get(element, {})
+        for field, value in values.items():
+            if old.get(field) != value:
+                deltas += [[timestamp, element, field, value]]
+
+    history_path = get_history_path(base_filename)
+    new_file = not os.path.exists(history_path)
+    with open(history_path, 'a', encoding='utf-8', newline='') as outf:
+        w = csv.writer(outf)
+        if new_file:
+            w.writerow(HISTORY_FIELDS)
+        w.writerows(deltas)
+    for element, values in current.items():
+        previous.setdefault(element, {}).update(values)
+    state_path = get_state_path(base_filename)
+    with open(state_path + '.tmp', 'w', encoding='utf-8') as outf:
+        json.dump(previous, outf)
+    os.replace(state_path + '.tmp', state_path)
+    return len(deltas)
+
+
+def load_history(base_filename):
+    return pd.read_csv(get_history_path(base_filename), dtype={'value': str}, keep_default_na=False)
+
+
+def get_state_at(base_filename, timestamp=None, history=None):
+    """ State of every element at a point in time, one row per element and one column per field
+
+    Args:
+        base_filename (str): Season folder, e.g. 'data/2024-25/'
+        timestamp (str): Time in TIMESTAMP_FORMAT, the latest state when None
+        history: df as returned by load_history, read from disk when None
+    """
+    if history is None:
+        history = load_history(base_filename)
+    if timestamp is not None:
+        history = history[history['timestamp'] <= timestamp]
+    latest = history.drop_duplicates(['element', 'field'], keep='last')
+    return latest.pivot(index='element', columns='field', values='value')
+
+
+def get_series(base_filename, field, elements=None, history=None):
+    """ Every recorded value of a field, one row per change
+
+    Args:
+        base_filename (str): Season folder, e.g. 'data/2024-25/'
+        field (str): Field to follow, e.g. 'now_cost'
+        elements (list): Elements to include, every element when None
+        history: df as returned by load_history, read from disk when None
+    """
+    if history is None:
+        history = load_history(base_filename)
+    series = history[history['field'] == field]
+    if elements is not None:
+        series = series[series['element'].isin(elements)]
+    return series[['timestamp', 'element', 'value']].reset_index(drop=True)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python price_history.py <season_folder> [timestamp]. Eg: python price_history.py data/2024-25/ 2024-09-01T12:00:00Z")
+        sys.exit(1)
+    base_filename = sys.argv[1]
+    if len(sys.argv) > 2:
+        print(get_state_at(base_filename, sys.argv[2])[['now_cost', 'selected_by_percent', 'status']].to_string())
+    else:
+        from getters import get_data
+        print("Recorded " + str(record_snapshot(get_data()['elements'], base_filename)) + " changes")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from getters import get_fixtures_data
+from gameweek import get_recent_gameweek_id_from_fixtures
+
+# Seconds between polls while a match is being played
+LIVE_INTERVAL = 120
+# Seconds between polls while finished matches wait for confirmed bonus
+BONUS_INTERVAL = 600
+# Longest the scheduler sleeps when nothing is going on
+IDLE_INTERVAL = 6 * 60 * 60
+# How long before a kickoff the scheduler wakes up
+PRE_KICKOFF = timedelta(minutes=5)
+# How long a match is considered in play after kickoff
+MATCH_LENGTH = timedelta(hours=2, minutes=30)
+# Delay after the last kickoff of a gameweek before the full scrape,
+# same as the cron lines printed by schedule.generate_schedule
+FULL_SCRAPE_DELAY = timedelta(hours=12)
+# Prices change overnight; the players data is refreshed once a day after this
+PRICE_CHANGE_TIME = timedelta(hours=2)
+# Seconds before retrying after a failure, doubled after every failure in a row
+RETRY_INTERVAL = 60
+MAX_RETRY_INTERVAL = 30 * 60
+
+
+def parse_kickoff(kickoff_time):
+    return datetime.strptime(kickoff_time, '%Y-%m-%dT%H:%M:%SZ')
+
+
+def load_state(state_file):
+    """ Load the scheduler state, or an empty state on the first run
+
+    Args:
+        state_file (str): Path of the json file the state is kept in
+    """
+    state = {'finished_fixtures': [], 'scraped_gws': [], 'last_prices': ''}
+    if os.path.exists(state_file):
+        with open(state_file, 'r') as fin:
+            state.update(json.load(fin))
+    return state
+
+
+def save_state(state, state_file):
+    tmp_file = state_file + '.tmp'
+    with open(tmp_file, 'w') as outf:
+        json.dump(state, outf, indent=1)
+    os.replace(tmp_file, state_file)
+
+
+def plan(fixtures, state, now):
+    """ Work out which pipeline stages are due and how long to sleep afterwards
+
+    Stages are returned as (stage, gw) tuples where stage is one of
+    'live' (a match is in play), 'bonus' (a match has been marked finished,
+    so its bonus points are confirmed), 'full' (every match of the gameweek
+    is done and the full scrape is due) and 'prices' (daily price changes).
+
+    Args:
+        fixtures (list): fixtures payload
+        state (dict): Scheduler state as returned by load_state
+        now (datetime): Current UTC time
+    """
+    stages = []
+    wakeups = [now + timedelta(seconds=IDLE_INTERVAL)]
+    finished = set(state['finished_fixtures'])
+    scraped = set(state['scraped_gws'])
+    gw_kickoffs = {}
+    gw_finished = {}
+    live_gws = set()
+    bonus_gws = set()
+    for f in fixtures:
+        if f['event'] is None or f['kickoff_time'] is None:
+            continue
+        gw = f['event']
+        kickoff = parse_kickoff(f['kickoff_time'])
+        gw_kickoffs.setdefault(gw, []).append(kickoff)
+        gw_finished[gw] = gw_finished.get(gw, True) and f['finished']
+        if f['finished']:
+            if f['id'] not in finished:
+                bonus_gws.add(gw)
+        elif f['finished_provisional']:
+            wakeups += [now + timedelta(seconds=BONUS_INTERVAL)]
+        elif kickoff <= now < kickoff + MATCH_LENGTH or f['started']:
+            live_gws.add(gw)
+            wakeups += [now + timedelta(seconds=LIVE_INTERVAL)]
+        elif kickoff > now:
+            wakeups += [kickoff - PRE_KICKOFF]
+
+    for gw in sorted(live_gws):
+        stages += [('live', gw)]
+    for gw in sorted(bonus_gws - live_gws):
+        stages += [('bonus', gw)]
+    for gw, kickoffs in sorted(gw_kickoffs.items()):
+        if gw in scraped or not gw_finished[gw]:
+            continue
+        run_date = max(kickoffs) + FULL_SCRAPE_DELAY
+        if run_date <= now:
+            stages += [('full', gw)]
+        else:
+            wakeups += [run_date]
+
+    price_time = datetime(now.year, now.month, now.day) + PRICE_CHANGE_TIME
+    if now >= price_time and state['last_prices'] != now.strftime('%Y-%m-%d'):
+        stages += [('prices', get_recent_gameweek_id_from_fixtures(fixtures, now))]
+    elif now < price_time:
+        wakeups += [price_time]
+    else:
+        wakeups += [price_time + timedelta(days=1)]
+
+    sleep = max((min(wakeups) - now).total_seconds(), 0)
+    return stages, sleep
+
+
+def seed_state(state, fixtures, now):
+    """ Mark everything that already happened as done, so the first run does not
+    rescrape the whole season
+    """
+    state['finished_fixtures'] = [f['id'] for f in fixtures if f['finished']]
+    stages, _ = plan(fixtures, state, now)
+    state['scraped_gws'] = [gw for stage, gw in stages if stage == 'full']
+    return state
+
+
+def run_stage(stage, gw, base_filename):
+    """ Run a single pipeline stage, importing it only when it is needed
+    """
+    gw_base_filename = os.path.join(base_filename, 'gws')
+    if stage == 'live' or stage == 'bonus':
+        from live_collector import collect_live_gw
+        collect_live_gw(gw, gw_base_filename)
+    elif stage == 'full':
+        from global_scraper import parse_data
+        parse_data()
+    elif stage == 'prices':
+        from getters import get_data
+        from parsers import parse_players
+        from cleaners import clean_players
+        from price_history import record_snapshot
+        data = get_data()
+        parse_players(data["elements"], base_filename)
+        clean_players(base_filename + 'players_raw.csv', base_filename)
+        record_snapshot(data["elements"], base_filename)
+
+
+def get_retry_interval(failures):
+    """ Seconds to wait after the given number of failed polls in a row
+    """
+    return min(RETRY_INTERVAL * 2 ** (failures - 1), MAX_RETRY_INTERVAL)
+
+
+def try_stage(stage, gw, base_filename, now):
+    """ Run a stage, logging instead of raising when it fails
+
+    Returns whether the stage succeeded.
+    """
+    try:
+        run_stage(stage, gw, base_filename)
+        return True
+    except Exception as e:
+        print(now.strftime('%Y-%m-%d %H:%M') + " " + stage + " for gw" + str(gw) + " failed: " + repr(e))
+        return False
+
+
+def run(state_file, base_filename='data/2024-25/'):
+    """ Poll the fixtures forever and trigger the stages that are due
+
+    A failed fetch or stage is logged and retried after a backoff, e.g. while
+    the FPL API answers 503 during its game updates. A failed stage is not
+    marked as done, so the next poll plans it again.
+
+    Args:
+        state_file (str): Path of the json file the state is kept in
+        base_filename (str): Season folder the stages write to
+    """
+    first_run = not os.path.exists(state_file)
+    state = load_state(state_file)
+    failures = 0
+    while True:
+        now = datetime.utcnow()
+        try:
+            fixtures = get_fixtures_data()
+        except Exception as e:
+            failures += 1
+            print(now.strftime('%Y-%m-%d %H:%M') + " Fetching the fixtures failed: " + repr(e))
+            time.sleep(get_retry_interval(failures))
+            continue
+        if first_run:
+            state = seed_state(state, fixtures, now)
+            first_run = False
+        stages, sleep = plan(fixtures, state, now)
+        done = set()
+        failed = set()
+        failed_bonus_gws = set()
+        for stage, gw in stages:
+            # the full scrape always covers the current gameweek, so once is enough
+            if stage == 'full' and ('full' in done or 'full' in failed):
+                ok = 'full' in done
+            else:
+                print(now.strftime('%Y-%m-%d %H:%M') + " Running " + stage + " for gw" + str(gw))
+                ok = try_stage(stage, gw, base_filename, now)
+            if not ok:
+                failed.add(stage)
+                if stage == 'bonus':
+                    failed_bonus_gws.add(gw)
+                continue
+            done.add(stage)
+            if stage == 'full':
+                state['scraped_gws'] += [gw]
+            elif stage == 'prices':
+                state['last_prices'] = now.strftime('%Y-%m-%d')
+        # fixtures of a gameweek whose bonus failed stay unfinished, so the bonus is planned again
+        previous = set(state['finished_fixtures'])
+        state['finished_fixtures'] = [f['id'] for f in fixtures if f['finished']
+                                      and (f['event'] not in failed_bonus_gws or f['id'] in previous)]
+        save_state(state, state_file)
+        if failed:
+            failures += 1
+            sleep = min(sleep, get_retry_interval(failures))
+        else:
+            failures = 0
+        time.sleep(sleep)
+
+
+def main():
+    state_file = 'scheduler_state.json'
+    if len(sys.argv) > 1:
+        state_file = sys.argv[1]
+    run(state_file)
+
+if __name__ == '__main__':
+    main()
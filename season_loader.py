@@ -0,0 +1,188 @@
+import glob
+import os
+import re
+import pandas as pd
+
+# Dtype of every column that can appear in a season's gameweek data. Integers are
+# nullable so that columns missing from a season are filled the same way everywhere.
+COLUMN_DTYPES = {
+    'name': 'object', 'position': 'object', 'team': 'object', 'kickoff_time': 'object',
+    'xP': 'float32', 'assists': 'Int32', 'bonus': 'Int32', 'bps': 'Int32',
+    'clean_sheets': 'Int32', 'creativity': 'float32', 'element': 'Int32',
+    'expected_assists': 'float32', 'expected_goal_involvements': 'float32',
+    'expected_goals': 'float32', 'expected_goals_conceded': 'float32',
+    'fixture': 'Int32', 'goals_conceded': 'Int32', 'goals_scored': 'Int32',
+    'ict_index': 'float32', 'influence': 'float32', 'minutes': 'Int32',
+    'opponent_team': 'Int32', 'own_goals': 'Int32', 'penalties_missed': 'Int32',
+    'penalties_saved': 'Int32', 'red_cards': 'Int32', 'round': 'Int32', 'saves': 'Int32',
+    'selected': 'Int32', 'starts': 'Int32', 'team_a_score': 'Int32',
+    'team_h_score': 'Int32', 'threat': 'float32', 'total_points': 'Int32',
+    'transfers_balance': 'Int32', 'transfers_in': 'Int32', 'transfers_out': 'Int32',
+    'value': 'Int32', 'was_home': 'boolean', 'yellow_cards': 'Int32', 'GW': 'Int32',
+    # only collected from 2016-17 to 2018-19
+    'attempted_passes': 'Int32', 'big_chances_created': 'Int32',
+    'big_chances_missed': 'Int32', 'clearances_blocks_interceptions': 'Int32',
+    'completed_passes': 'Int32', 'dribbles': 'Int32', 'ea_index': 'Int32',
+    'errors_leading_to_goal': 'Int32', 'errors_leading_to_goal_attempt': 'Int32',
+    'fouls': 'Int32', 'id': 'Int32', 'key_passes': 'Int32',
+    'kickoff_time_formatted': 'object', 'loaned_in': 'Int32', 'loaned_out': 'Int32',
+    'offside': 'Int32', 'open_play_crosses': 'Int32', 'penalties_conceded': 'Int32',
+    'recoveries': 'Int32', 'tackled': 'Int32', 'tackles': 'Int32',
+    'target_missed': 'Int32', 'winning_goals': 'Int32',
+}
+
+BASE_COLUMNS = ['name', 'assists', 'bonus', 'bps', 'clean_sheets', 'creativity', 'element',
+                'fixture', 'goals_conceded', 'goals_scored', 'ict_index', 'influence',
+                'kickoff_time', 'minutes', 'opponent_team', 'own_goals', 'penalties_missed',
+                'penalties_saved', 'red_cards', 'round', 'saves', 'selected', 'team_a_score',
+                'team_h_score', 'threat', 'total_points', 'transfers_balance', 'transfers_in',
+                'transfers_out', 'value', 'was_home', 'yellow_cards', 'GW']
+LEGACY_COLUMNS = ['attempted_passes', 'big_chances_created', 'big_chances_missed',
+                  'clearances_blocks_interceptions', 'completed_passes', 'dribbles',
+                  'ea_index', 'errors_leading_to_goal', 'errors_leading_to_goal_attempt',
+                  'fouls', 'id', 'key_passes', 'kickoff_time_formatted', 'loaned_in',
+                  'loaned_out', 'offside', 'open_play_crosses', 'penalties_conceded',
+                  'recoveries', 'tackled', 'tackles', 'target_missed', 'winning_goals']
+POSITION_COLUMNS = ['position', 'team', 'xP']
+EXPECTED_COLUMNS = ['expected_assists', 'expected_goal_involvements', 'expected_goals',
+                    'expected_goals_conceded', 'starts']
+
+# Season -> columns and encoding of its gameweek data. An encoding of None means
+# it is detected from the file the first time the season is loaded.
+SEASON_SCHEMAS = {
+    '2016-17': {'columns': BASE_COLUMNS + LEGACY_COLUMNS, 'encoding': 'latin-1'},
+    '2017-18': {'columns': BASE_COLUMNS + LEGACY_COLUMNS, 'encoding': 'latin-1'},
+    '2018-19': {'columns': BASE_COLUMNS + LEGACY_COLUMNS, 'encoding': 'latin-1'},
+    '2019-20': {'columns': BASE_COLUMNS, 'encoding': 'utf-8'},
+    '2020-21': {'columns': BASE_COLUMNS + POSITION_COLUMNS, 'encoding': 'utf-8'},
+    '2021-22': {'columns': BASE_COLUMNS + POSITION_COLUMNS, 'encoding': 'utf-8'},
+    '2022-23': {'columns': BASE_COLUMNS + POSITION_COLUMNS + EXPECTED_COLUMNS, 'encoding': 'utf-8'},
+    '2023-24': {'columns': BASE_COLUMNS + POSITION_COLUMNS + EXPECTED_COLUMNS, 'encoding': 'utf-8'},
+    '2024-25': {'columns': BASE_COLUMNS + POSITION_COLUMNS + EXPECTED_COLUMNS, 'encoding': 'utf-8'},
+}
+
+_encoding_cache = {}
+
+
+def get_season_dir(season, data_dir='data'):
+    return os.path.join(os.getcwd(), data_dir, season)
+
+
+def get_season_files(season, data_dir='data'):
+    """ Files holding a season's gameweek data, with the GW each one covers
+
+    merged_gw.csv is used when it exists, otherwise the individual gwN.csv files.
+
+    Args:
+        season (str): Name of the season folder, e.g. '2023-24'
+        data_dir (str): Folder containing the season folders
+    """
+    gw_dir = os.path.join(get_season_dir(season, data_dir), 'gws')
+    merged = os.path.join(gw_dir, 'merged_gw.csv')
+    if os.path.exists(merged):
+        return [(merged, None)]
+    files = []
+    for path in glob.glob(os.path.join(gw_dir, 'gw*.csv')):
+        match = re.match(r'gw(\d+)\.csv$', os.path.basename(path))
+        if match:
+            files += [(path, int(match.group(1)))]
+    return sorted(files, key=lambda f: f[1])
+
+
+def detect_encoding(path):
+    """ Detect whether a file is utf-8 or latin-1, caching the result per file
+
+    Args:
+        path (str): Path of the file
+    """
+    stat = os.stat(path)
+    key = (path, stat.st_mtime, stat.st_size)
+    if key not in _encoding_cache:
+        encoding = 'utf-8'
+        with open(path, 'rb') as fin:
+            try:
+                fin.read().decode('utf-8')
+            except UnicodeDecodeError:
+                encoding = 'latin-1'
+        _encoding_cache[key] = encoding
+    return _encoding_cache[key]
+
+
+def get_season_encoding(season, path):
+    schema = SEASON_SCHEMAS.get(season)
+    if schema is not None and schema['encoding'] is not None:
+        return schema['encoding']
+    return detect_encoding(path)
+
+
+def read_header(path, encoding):
+    with open(path, 'r', encoding=encoding) as fin:
+        return fin.readline().strip().split(',')
+
+
+def check_schema(season, header):
+    """ Warn when a season's files and its declared schema disagree
+    """
+    if season not in SEASON_SCHEMAS:
+        print("No schema declared for " + season + ", using its header")
+        return
+    declared = set(SEASON_SCHEMAS[season]['columns']) - {'GW'}
+    undeclared = set(header) - declared - {'GW'}
+    if len(undeclared) > 0:
+        print(season + " has undeclared columns: " + ', '.join(sorted(undeclared)))
+    absent = declared - set(header)
+    if len(absent) > 0:
+        print(season + " is missing declared columns: " + ', '.join(sorted(absent)))
+
+
+def empty_column(dtype, index):
+    if dtype == 'object':
+        return pd.Series([None] * len(index), index=index, dtype='object')
+    return pd.Series(pd.array([None] * len(index), dtype=dtype), index=index)
+
+
+def load_season(season, columns=None, data_dir='data', gw=None):
+    """ Load a season's gameweek data, reading only the requested columns
+
+    Columns are parsed with the dtypes declared in COLUMN_DTYPES. Requested
+    columns that the season does not have are filled with missing values of
+    the declared dtype, and a 'season' column is added.
+
+    Args:
+        season (str): Name of the season folder, e.g. '2023-24'
+        columns (list): Columns to load, all of the season's columns when None
+        data_dir (str): Folder containing the season folders
+        gw (int): Only load this gameweek, from its gwN.csv file
+    """
+    if gw is None:
+        files = get_season_files(season, data_dir)
+    else:
+        path = os.path.join(get_season_dir(season, data_dir), 'gws', 'gw' + str(gw) + '.csv')
+        files = [(path, gw)] if os.path.exists(path) else []
+    if len(files) == 0:
+        raise Exception("No gameweek data found for " + season)
+    encoding = get_season_encoding(season, files[0][0])
+    header = read_header(files[0][0], encoding)
+    check_schema(season, header)
+    if columns is None:
+        columns = list(header)
+        if 'GW' not in columns:
+            columns += ['GW']
+    columns = [c for c in columns if c != 'season']
+    usecols = [c for c in columns if c in header]
+    dtypes = {c: COLUMN_DTYPES.get(c, 'object') for c in usecols}
+
+    dfs = []
+    for path, gw in files:
+        df = pd.read_csv(path, encoding=encoding, usecols=usecols, dtype=dtypes)
+        if gw is not None and 'GW' in columns and 'GW' not in usecols:
+            df['GW'] = pd.array([gw] * len(df), dtype=COLUMN_DTYPES['GW'])
+        dfs.append(df)
+    df = pd.concat(dfs, ignore_index=True, sort=False) if len(dfs) > 1 else dfs[0]
+
+    for c in columns:
+        if c not in df.columns:
+            df[c] = empty_column(COLUMN_DTYPES.get(c, 'object'), df.index)
+    df = df.loc[:, columns]
+    df.insert(0, 'season', season)
+    return df
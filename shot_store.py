@@ -0,0 +1,253 @@
+import json
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# Column -> dtype of the values stored for every shot
+SHOT_COLUMNS = {
+    'id': 'int64', 'match_id': 'int32', 'player_id': 'int32', 'minute': 'int16',
+    'X': 'float32', 'Y': 'float32', 'xG': 'float32', 'date': 'int64', 'cell': 'uint8',
+    'h_a': 'uint8', 'result': 'uint8', 'situation': 'uint8', 'shotType': 'uint8', 'lastAction': 'uint8',
+}
+# Columns stored as codes into a vocabulary kept in meta.json
+CATEGORY_COLUMNS = ['h_a', 'result', 'situation', 'shotType', 'lastAction']
+# Columns with an index, i.e. a permutation of the shots sorted by the column
+INDEX_COLUMNS = ['player_id', 'match_id', 'cell']
+
+# Grid lines along the pitch (X, towards the goal attacked) and across it (Y),
+# as fractions of its length and width. They follow the pitch markings, so the
+# box and the six-yard box are unions of cells.
+X_EDGES = [0.5, 0.7, 0.83, 0.94]
+Y_EDGES = [0.21, 0.37, 0.63, 0.79]
+NUM_Y_CELLS = len(Y_EDGES) + 1
+
+
+def get_cells(x_band, y_bands):
+    return [x * NUM_Y_CELLS + y for x in x_band for y in y_bands]
+
+
+# Cells of the penalty box and the six-yard box
+BOX_CELLS = get_cells([3, 4], [1, 2, 3])
+SIX_YARD_CELLS = get_cells([4], [2])
+
+
+def get_store_dir(season, data_dir='data'):
+    return os.path.join(os.getcwd(), data_dir, season, 'understat', 'shots')
+
+
+def get_grid_cell(x, y):
+    """ Coarse pitch grid cell of shot coordinates
+    """
+    return (np.searchsorted(X_EDGES, x, side='right') * NUM_Y_CELLS
+            + np.searchsorted(Y_EDGES, y, side='right')).astype('uint8')
+
+
+def load_meta(store_dir):
+    path = os.path.join(store_dir, 'meta.json')
+    if not os.path.exists(path):
+        return {'count': 0, 'vocabularies': {c: [] for c in CATEGORY_COLUMNS}}
+    with open(path, 'r') as fin:
+        return json.load(fin)
+
+
+def encode_shots(shots, vocabularies):
+    """ Turn understat shotsData records into one array per column
+
+    Args:
+        shots (list): Shot dicts as parsed from a player page's shotsData
+        vocabularies (dict): Category column -> list of known values, extended in place
+    """
+    frame = pd.DataFrame.from_records(shots)
+    columns = {}
+    for c in ['id', 'match_id', 'player_id', 'minute']:
+        columns[c] = pd.to_numeric(frame[c]).to_numpy(SHOT_COLUMNS[c])
+    for c in ['X', 'Y', 'xG']:
+        columns[c] = pd.to_numeric(frame[c]).to_numpy(SHOT_COLUMNS[c])
+    columns['date'] = pd.to_datetime(frame['date']).to_numpy('datetime64[s]').astype('int64')
+    columns['cell'] = get_grid_cell(columns['X'], columns['Y'])
+    for c in CATEGORY_COLUMNS:
+        codes = {value: i for i, value in enumerate(vocabularies[c])}
+        for value in frame[c].unique():
+            if value not in codes:
+                codes[value] = len(vocabularies[c])
+                vocabularies[c] += [value]
+        columns[c] = frame[c].map(codes).to_numpy(SHOT_COLUMNS[c])
+    return columns
+
+
+def append_shots(shots, store_dir):
+    """ Append shots to a season's store, skipping shot ids it already holds
+
+    Every column is a raw binary file the new shots are appended to. Columns
+    are first cut back to the count in meta.json, so the leftovers of an
+    interrupted append are dropped. The indexes are not rebuilt, call
+    build_indexes once all the shots of a refresh are appended.
+
+    Args:
+        shots (list): Shot dicts as parsed from a player page's shotsData
+        store_dir (str): Folder of the season's shot store
+    """
+    if len(shots) == 0:
+        return 0
+    os.makedirs(store_dir, exist_ok=True)
+    meta = load_meta(store_dir)
+    columns = encode_shots(shots, meta['vocabularies'])
+    existing = read_column(store_dir, 'id', meta['count'])
+    _, first = np.unique(columns['id'], return_index=True)
+    keep = np.zeros(len(columns['id']), dtype=bool)
+    keep[first] = True
+    keep &= ~np.isin(columns['id'], existing)
+    if not keep.any():
+        return 0
+    for c in SHOT_COLUMNS:
+        path = os.path.join(store_dir, c + '.bin')
+        size = meta['count'] * np.dtype(SHOT_COLUMNS[c]).itemsize
+        if os.path.exists(path) and os.path.getsize(path) > size:
+            os.truncate(path, size)
+        with open(path, 'ab') as outf:
+            outf.write(columns[c][keep].tobytes())
+    meta['count'] += int(keep.sum())
+    save_meta(meta, store_dir)
+    return int(keep.sum())
+
+
+def build_indexes(store_dir):
+    """ Rebuild the index of every INDEX_COLUMNS column, unless they already cover every shot
+    """
+    meta = load_meta(store_dir)
+    if meta['count'] == 0 or meta.get('indexed') == meta['count']:
+        return
+    for c in INDEX_COLUMNS:
+        order = np.argsort(read_column(store_dir, c, meta['count']), kind='stable').astype('int32')
+        order.tofile(os.path.join(store_dir, 'by_' + c + '.bin'))
+    meta['indexed'] = meta['count']
+    save_meta(meta, store_dir)
+
+
+def save_meta(meta, store_dir):
+    path = os.path.join(store_dir, 'meta.json')
+    with open(path + '.tmp', 'w') as outf:
+        json.dump(meta, outf)
+    os.replace(path + '.tmp', path)
+
+
+def read_column(store_dir, column, count):
+    path = os.path.join(store_dir, column + '.bin')
+    if count == 0 or not os.path.exists(path):
+        return np.zeros(0, dtype=SHOT_COLUMNS[column])
+    return np.fromfile(path, dtype=SHOT_COLUMNS[column], count=count)
+
+
+class ShotStore:
+    """ Read access to a season's shots; columns are memory-mapped on first use
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.meta = load_meta(store_dir)
+        self.count = self.meta['count']
+        self.columns = {}
+        self.indexes = {}
+
+    def column(self, name):
+        if name not in self.columns:
+            if self.count == 0:
+                self.columns[name] = np.zeros(0, dtype=SHOT_COLUMNS[name])
+            else:
+                self.columns[name] = np.memmap(os.path.join(self.store_dir, name + '.bin'),
+                                               dtype=SHOT_COLUMNS[name], mode='r', shape=(self.count,))
+        return self.columns[name]
+
+    def lookup(self, name, values):
+        """ Rows whose `name` column is one of `values`, found through the column's index
+        """
+        if name not in self.indexes:
+            if self.meta.get('indexed') == self.count and self.count:
+                order = np.fromfile(os.path.join(self.store_dir, 'by_' + name + '.bin'),
+                                    dtype='int32', count=self.count)
+            else:
+                # shots appended since the indexes were last built
+                order = np.argsort(np.asarray(self.column(name)), kind='stable').astype('int32')
+            self.indexes[name] = (order, np.asarray(self.column(name))[order])
+        order, keys = self.indexes[name]
+        values = np.unique(np.asarray(values))
+        starts = np.searchsorted(keys, values, side='left')
+        ends = np.searchsorted(keys, values, side='right')
+        if len(values) == 0:
+            return np.zeros(0, dtype='int32')
+        return np.sort(np.concatenate([order[s:e] for s, e in zip(starts, ends)]))
+
+    def select(self, players=None, matches=None, cells=None):
+        """ Row numbers of the shots matching every filter given
+
+        Args:
+            players (list): understat player ids
+            matches (list): understat match ids
+            cells (list): Pitch grid cells, e.g. BOX_CELLS
+        """
+        rows = None
+        for name, values in [('player_id', players), ('match_id', matches), ('cell', cells)]:
+            if values is None:
+                continue
+            found = self.lookup(name, values)
+            rows = found if rows is None else np.intersect1d(rows, found, assume_unique=True)
+        if rows is None:
+            rows = np.arange(self.count)
+        return rows
+
+    def frame(self, rows=None, columns=None):
+        """ df of the given rows, with categories decoded
+        """
+        if rows is None:
+            rows = np.arange(self.count)
+        df = pd.DataFrame({c: np.asarray(self.column(c))[rows] for c in (columns or SHOT_COLUMNS)})
+        for c in CATEGORY_COLUMNS:
+            if c in df:
+                df[c] = np.asarray(self.meta['vocabularies'][c], dtype=object)[df[c].to_numpy()]
+        if 'date' in df:
+            df['date'] = pd.to_datetime(df['date'], unit='s')
+        return df
+
+
+def get_gameweeks_by_date(fixtures_path):
+    """ Gets the gameweek of every matchday as sorted arrays of days and gameweeks
+
+    A day takes the gameweek most of its fixtures belong to, so rearranged
+    fixtures played on their own day keep their own gameweek.
+    """
+    fixtures = pd.read_csv(fixtures_path, usecols=['event', 'kickoff_time']).dropna()
+    fixtures['day'] = pd.to_datetime(fixtures['kickoff_time']).dt.tz_localize(None).dt.floor('D')
+    by_day = fixtures.groupby('day')['event'].agg(lambda e: e.mode().iloc[0])
+    return by_day.index.to_numpy('datetime64[s]').astype('int64'), by_day.to_numpy('int64')
+
+
+def xg_per_player_gw(store, fixtures_path, cells=None):
+    """ xG of every player in every gameweek, from the shots in the given cells
+
+    Args:
+        store (ShotStore): Shot store of the season
+        fixtures_path (str): fixtures.csv of the season, to map match days to gameweeks
+        cells (list): Pitch grid cells to count, every cell when None
+    """
+    rows = store.select(cells=cells)
+    days, gws = get_gameweeks_by_date(fixtures_path)
+    date = np.asarray(store.column('date'))[rows]
+    day = date - date % 86400
+    gw = gws[np.clip(np.searchsorted(days, day, side='right') - 1, 0, len(gws) - 1)]
+    df = pd.DataFrame({'player_id': np.asarray(store.column('player_id'))[rows], 'gw': gw,
+                       'xG': np.asarray(store.column('xG'))[rows].astype('float64')})
+    return df.groupby(['player_id', 'gw'], as_index=False).agg(shots=('xG', 'size'), xG=('xG', 'sum'))
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python shot_store.py <season>. Eg: python shot_store.py 2024-25")
+        sys.exit(1)
+    season = sys.argv[1]
+    store = ShotStore(get_store_dir(season))
+    box = xg_per_player_gw(store, os.path.join('data', season, 'fixtures.csv'), BOX_CELLS)
+    print(box.sort_values('xG', ascending=False).head(20).to_string(index=False))
+
+if __name__ == '__main__':
+    main()
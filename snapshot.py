@@ -0,0 +1,110 @@
+import os
+import pickle
+import sys
+import tempfile
+import time
+try:
+    import fcntl
+except ImportError:
+    # without fcntl (Windows) concurrent tools each fetch on their own
+    fcntl = None
+
+# Seconds a snapshot is served for before it is fetched again
+FRESHNESS = 60
+
+
+def get_snapshot_dir():
+    """ Folder shared by every tool of a user, FPL_SNAPSHOT_DIR or a per-user folder in the temp directory
+    """
+    if 'FPL_SNAPSHOT_DIR' in os.environ:
+        return os.environ['FPL_SNAPSHOT_DIR']
+    user = str(os.getuid()) if hasattr(os, 'getuid') else os.environ.get('USERNAME', 'default')
+    return os.path.join(tempfile.gettempdir(), 'fpl_snapshots_' + user)
+
+
+def make_snapshot_dir():
+    """ Create the snapshot folder readable and writable by its owner only
+
+    The folder of another user, or one others can write to, is refused, as
+    anyone who can write to it could plant a pickle that runs code in every tool.
+    """
+    directory = get_snapshot_dir()
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    if hasattr(os, 'getuid'):
+        stat = os.stat(directory)
+        if stat.st_uid != os.getuid() or stat.st_mode & 0o022:
+            raise PermissionError("Snapshot folder " + directory + " is not private to this user")
+    return directory
+
+
+def get_snapshot_path(name):
+    return os.path.join(get_snapshot_dir(), name + '.pickle')
+
+
+def read_fresh(path, max_age):
+    """ Payload of a snapshot younger than max_age seconds, None otherwise
+    """
+    try:
+        if time.time() - os.path.getmtime(path) > max_age:
+            return None
+        with open(path, 'rb') as fin:
+            return pickle.load(fin)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def get_snapshot(name, fetch, max_age=FRESHNESS):
+    """ Payload of an endpoint, shared between every tool through a file-backed store
+
+    A snapshot younger than max_age is read from its pickle, which is much
+    faster than parsing the JSON again. Only the user's own private folder is
+    ever unpickled from, see make_snapshot_dir. Otherwise the snapshot's lock is
+    taken before fetching, so tools asking at the same time wait for the one
+    fetch in flight and read its result instead of fetching it themselves.
+
+    Args:
+        name (str): Name of the snapshot, e.g. 'bootstrap-static'
+        fetch (function): Fetches and parses the payload
+        max_age (int): Oldest snapshot to serve, in seconds, 0 to always fetch
+    """
+    make_snapshot_dir()
+    path = get_snapshot_path(name)
+    data = read_fresh(path, max_age)
+    if data is not None:
+        return data
+    with open(path + '.lock', 'w') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        # another tool may have fetched it while this one waited for the lock
+        data = read_fresh(path, max_age) if max_age > 0 else None
+        if data is None:
+            data = fetch()
+            # unique per process, as there is no lock without fcntl
+            tmp_path = path + '.' + str(os.getpid()) + '.tmp'
+            with open(tmp_path, 'wb') as outf:
+                pickle.dump(data, outf, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+    return data
+
+
+def clear_snapshots():
+    """ Remove every stored snapshot, the next request of each is fetched
+    """
+    if not os.path.isdir(get_snapshot_dir()):
+        return
+    for fname in os.listdir(get_snapshot_dir()):
+        if fname.endswith('.pickle'):
+            os.remove(os.path.join(get_snapshot_dir(), fname))
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'clear':
+        clear_snapshots()
+        return
+    for fname in sorted(os.listdir(get_snapshot_dir())) if os.path.isdir(get_snapshot_dir()) else []:
+        if fname.endswith('.pickle'):
+            age = time.time() - os.path.getmtime(os.path.join(get_snapshot_dir(), fname))
+            print(fname[:-len('.pickle')].ljust(20) + str(int(age)) + "s old")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+from season_loader import SEASON_SCHEMAS, load_season
+
+ROW_COLUMNS = ['GW', 'fixture', 'kickoff_time', 'was_home', 'opponent_team', 'team_h_score',
+               'team_a_score', 'minutes', 'goals_scored', 'assists', 'own_goals', 'saves',
+               'bonus', 'bps', 'total_points', 'expected_goals', 'expected_assists']
+# Player stats summed into team totals per fixture
+SUM_COLUMNS = ['goals_scored', 'assists', 'own_goals', 'saves', 'bonus', 'bps', 'total_points',
+               'expected_goals', 'expected_assists']
+CUBE_KEY = ['season', 'fixture', 'team']
+
+
+def get_cube_path(data_dir='data'):
+    return os.path.join(os.getcwd(), data_dir, 'team_fixtures.csv')
+
+
+def get_team_names(season, data_dir='data'):
+    """ Gets the team names of a season as a dict of team id -> name
+
+    master_team_list.csv is used when it covers the season, teams.csv otherwise.
+    """
+    teams = pd.read_csv(os.path.join(os.getcwd(), data_dir, 'master_team_list.csv'))
+    teams = teams[teams['season'] == season]
+    if len(teams) > 0:
+        return dict(zip(teams['team'], teams['team_name']))
+    teams = pd.read_csv(os.path.join(os.getcwd(), data_dir, season, 'teams.csv'))
+    return dict(zip(teams['id'], teams['name']))
+
+
+def add_player_teams(df):
+    """ Add the id of every row's team and whether it played at home
+
+    A player's team is the side of the fixture that is not his opponent, so
+    the gameweek rows alone are enough for every season, including those
+    without fixtures.csv.
+
+    Args:
+        df: Gameweek rows with 'fixture', 'was_home' and 'opponent_team'
+    """
+    home = df['was_home'].fillna(False).to_numpy(dtype=bool)
+    # the opponent of a home player is the away team and vice versa
+    sides = df[['fixture', 'opponent_team']].assign(home=~home).drop_duplicates(['fixture', 'home'])
+    team_by_side = sides.set_index(['fixture', 'home'])['opponent_team']
+    keys = pd.MultiIndex.from_arrays([df['fixture'], home])
+    return df.assign(team=team_by_side.reindex(keys).to_numpy(), home=home)
+
+
+def aggregate_fixtures(df, season, data_dir='data'):
+    """ One row per (fixture, team) with the team's totals and its opponent's
+
+    Args:
+        df: Gameweek rows of a season with the ROW_COLUMNS
+        season (str): Name of the season folder, e.g. '2019-20'
+        data_dir (str): Folder containing the season folders
+    """
+    df = add_player_teams(df[df['fixture'].notnull()])
+
+    sums = df.groupby(['fixture', 'team'])[SUM_COLUMNS].sum(min_count=1)
+    # float32 sums would print differently once appended to the float64 cube
+    sums[['expected_goals', 'expected_assists']] = sums[['expected_goals', 'expected_assists']].astype('float64').round(4)
+    first = df.groupby(['fixture', 'team'])[['GW', 'kickoff_time', 'home', 'opponent_team',
+                                              'team_h_score', 'team_a_score']].first()
+    cube = first.join(sums).reset_index()
+    cube['players'] = df.groupby(['fixture', 'team']).size().to_numpy()
+    cube['goals_for'] = np.where(cube['home'], cube['team_h_score'], cube['team_a_score'])
+    cube['goals_against'] = np.where(cube['home'], cube['team_a_score'], cube['team_h_score'])
+    cube['clean_sheet'] = cube['goals_against'] == 0
+
+    opponent = cube[['fixture', 'team', 'expected_goals', 'saves']].rename(
+        columns={'team': 'opponent_team', 'expected_goals': 'xg_against', 'saves': 'opponent_saves'})
+    cube = cube.merge(opponent, on=['fixture', 'opponent_team'], how='left')
+    names = get_team_names(season, data_dir)
+    cube['team_name'] = cube['team'].map(names)
+    cube['opponent_name'] = cube['opponent_team'].map(names)
+    cube.insert(0, 'season', season)
+    cube = cube.rename(columns={'expected_goals': 'xg_for', 'expected_assists': 'xa_for'})
+    return cube[['season', 'fixture', 'team', 'team_name', 'GW', 'kickoff_time', 'home',
+                 'opponent_team', 'opponent_name', 'goals_for', 'goals_against', 'clean_sheet',
+                 'xg_for', 'xg_against', 'xa_for', 'goals_scored', 'assists', 'own_goals', 'saves',
+                 'opponent_saves', 'bonus', 'bps', 'total_points', 'players']]
+
+
+def write_cube(cube, data_dir='data'):
+    cube = cube.sort_values(['season', 'kickoff_time', 'fixture', 'home'], ascending=[True, True, True, False])
+    cube.to_csv(get_cube_path(data_dir), index=False)
+    return cube
+
+
+def load_cube(data_dir='data'):
+    return pd.read_csv(get_cube_path(data_dir))
+
+
+def build_team_fixtures(seasons=None, data_dir='data'):
+    """ Build the cube of every season from scratch
+
+    Args:
+        seasons (list): Seasons to include, every season in the schema registry when None
+        data_dir (str): Folder containing the season folders
+    """
+    if seasons is None:
+        seasons = list(SEASON_SCHEMAS)
+    cubes = [aggregate_fixtures(load_season(season, ROW_COLUMNS, data_dir), season, data_dir)
+             for season in seasons]
+    return write_cube(pd.concat(cubes, ignore_index=True), data_dir)
+
+
+def update_team_fixtures(season, gw, data_dir='data'):
+    """ Add or replace the cube rows of the fixtures in a new gwN.csv
+
+    Only the gameweek's file is read; its fixtures replace any rows the cube
+    already has for them, e.g. from an earlier provisional scrape. Without a
+    cube, it is built for every season first.
+
+    Args:
+        season (str): Name of the season folder, e.g. '2024-25'
+        gw (int): ID of the gameweek that was added
+        data_dir (str): Folder containing the season folders
+    """
+    if not os.path.exists(get_cube_path(data_dir)):
+        return build_team_fixtures(data_dir=data_dir)
+    new = aggregate_fixtures(load_season(season, ROW_COLUMNS, data_dir, gw=gw), season, data_dir)
+    cube = load_cube(data_dir)
+    replaced = (cube['season'] == season) & cube['fixture'].isin(new['fixture'])
+    return write_cube(pd.concat([cube[~replaced], new], ignore_index=True), data_dir)
+
+
+def rolling_team_form(cube, window=5, columns=['goals_for', 'goals_against', 'xg_for', 'xg_against']):
+    """ Mean of each team's last `window` fixtures before every fixture
+
+    Joined back on the opponent, this gives the opponent strength going into
+    each fixture.
+
+    Args:
+        cube: df as returned by load_cube
+        window (int): Number of previous fixtures to average
+        columns (list): Cube columns to average
+    """
+    cube = cube.sort_values(['season', 'team', 'kickoff_time'])
+    rolled = (cube.groupby(['season', 'team'])[columns]
+              .transform(lambda c: c.shift(1).rolling(window, min_periods=1).mean()))
+    return cube[CUBE_KEY].join(rolled.add_suffix('_last' + str(window)))
+
+
+def main():
+    if len(sys.argv) == 3:
+        update_team_fixtures(sys.argv[1], int(sys.argv[2]))
+    else:
+        build_team_fixtures()
+
+if __name__ == '__main__':
+    main()
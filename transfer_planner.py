@@ -0,0 +1,265 @@
+import itertools
+import sys
+import time
+import numpy as np
+import pandas as pd
+from optimizer import BENCH_WEIGHT, MAX_PER_CLUB, is_valid_squad, lineup_value, load_players, optimize_squad
+
+HIT_COST = 4
+# Most a downgrade in a pair of transfers can free up for the other, in tenths of a million
+MAX_FUNDING = 50
+MAX_FREE_TRANSFERS = 5
+
+
+class OutOfTime(Exception):
+    pass
+
+
+def load_squad(picks_filename):
+    """ Gets the element ids of a squad from a picks_N.csv file written by teams_scraper
+    """
+    picks = pd.read_csv(picks_filename)
+    return sorted(picks['element'].astype(int).tolist())
+
+
+def load_projections(filename):
+    """ Load per-gameweek projected points from a csv with element, gw and points columns
+    """
+    projections = pd.read_csv(filename)
+    return projections.pivot_table(index='element', columns='gw', values='points', fill_value=0.0)
+
+
+class TransferPlanner:
+    """ Finds the best sequence of transfers over the next few gameweeks
+
+    The search is a depth-first search over (gameweek, squad, free transfers,
+    bank) states, memoized so that orders of transfers leading to the same state
+    are only expanded once. Only the best `width` replacements per position are
+    considered, and within a state a move is skipped when even a perfect
+    remaining horizon could not beat the best move found so far.
+
+    A gameweek makes at most `max_transfers` transfers, while free transfers
+    bank up to MAX_FREE_TRANSFERS as in FPL.
+    """
+
+    def __init__(self, players, projections, horizon, max_transfers=2):
+        gws = list(projections.columns)[:horizon]
+        self.horizon = len(gws)
+        self.players = players.set_index('id')
+        points = projections.reindex(self.players.index).fillna(0.0)[gws]
+        self.points = {i: row.to_numpy() for i, row in points.iterrows()}
+        # points from each gameweek to the end of the horizon
+        self.remaining = {i: np.cumsum(p[::-1])[::-1] for i, p in self.points.items()}
+        self.ranking = sorted(self.points, key=lambda i: self.remaining[i][0], reverse=True)
+        self.cost = self.players['now_cost'].to_dict()
+        self.position = self.players['element_type'].to_dict()
+        self.team = self.players['team'].to_dict()
+        self.max_transfers = max_transfers
+        self.gw_values = {}
+
+    def set_ceiling(self, budget, deadline=float('inf')):
+        """ Upper bound on the points still to come from each gameweek
+
+        Selling at now_cost keeps squad value plus bank constant, so no plan can
+        beat the best squad for that budget in every gameweek with its top
+        player as captain. Gameweeks reached after the deadline use the looser
+        bound of the best 15 players regardless of positions, clubs and budget.
+
+        Args:
+            budget (int): Squad value plus bank, in tenths of a million
+            deadline (float): Time after which the looser bound is used
+        """
+        self.ceiling = np.zeros(self.horizon + 1)
+        for t in range(self.horizon - 1, -1, -1):
+            gw_players = self.players.reset_index()
+            gw_players['points'] = [self.points[i][t] for i in gw_players['id']]
+            if time.time() < deadline:
+                squad = optimize_squad(gw_players, budget)
+                best = (squad['points'] * np.where(squad['is_starter'], 1.0, BENCH_WEIGHT)).sum()
+            else:
+                points = np.sort(gw_players['points'].to_numpy())[::-1]
+                best = points[:11].sum() + BENCH_WEIGHT * points[11:15].sum()
+            self.ceiling[t] = self.ceiling[t + 1] + best + gw_players['points'].max()
+
+    def gw_value(self, t, squad):
+        key = (t, squad)
+        if key not in self.gw_values:
+            self.gw_values[key] = lineup_value([self.points[i][t] for i in squad],
+                                               [self.position[i] for i in squad])
+        return self.gw_values[key]
+
+    def candidates(self, squad, width):
+        """ Best `width` players per position outside the squad, over the horizon
+        """
+        best = {}
+        for i in self.ranking:
+            if i in squad:
+                continue
+            position = self.position[i]
+            if len(best.setdefault(position, [])) < width:
+                best[position] += [i]
+                if sum(len(v) for v in best.values()) == 4 * width:
+                    break
+        return best
+
+    def moves(self, t, squad, bank, candidates):
+        """ Single transfers that keep the squad valid, best horizon gain first
+        """
+        teams = [self.team[i] for i in squad]
+        singles = []
+        for out in squad:
+            for i in candidates.get(self.position[out], []):
+                if self.cost[i] - self.cost[out] > bank:
+                    continue
+                if self.team[i] != self.team[out] and teams.count(self.team[i]) >= MAX_PER_CLUB:
+                    continue
+                gain = self.remaining[i][t] - self.remaining[out][t]
+                singles += [(gain, out, i)]
+        singles.sort(reverse=True)
+        return singles
+
+    def search(self, t, squad, free_transfers, bank, width):
+        if t == self.horizon:
+            return 0.0, []
+        if time.time() > self.deadline:
+            raise OutOfTime()
+        key = (t, squad, free_transfers, bank)
+        if key in self.memo:
+            return self.memo[key]
+
+        actions = [((), ())]
+        # a transfer is only worth making if it gains points over the horizon,
+        # or, as half of a pair, funds a bigger gain elsewhere
+        singles = self.moves(t, squad, bank + MAX_FUNDING, self.candidates(squad, width))[:width * 4]
+        actions += [((out,), (i,)) for gain, out, i in singles
+                    if gain > 0 and self.cost[i] - self.cost[out] <= bank]
+        for k in range(2, self.max_transfers + 1):
+            for moves in itertools.combinations(singles, k):
+                outs = tuple(out for _, out, _ in moves)
+                ins = tuple(i for _, _, i in moves)
+                if len(set(outs)) == k and len(set(ins)) == k and sum(gain for gain, _, _ in moves) > 0:
+                    actions += [(outs, ins)]
+
+        best_value = -np.inf
+        best_plan = None
+        for outs, ins in actions:
+            new_squad = tuple(sorted((set(squad) - set(outs)) | set(ins)))
+            new_bank = bank + sum(self.cost[i] for i in outs) - sum(self.cost[i] for i in ins)
+            if new_bank < 0:
+                continue
+            if len(outs) > 1 and not is_valid_squad([self.position[i] for i in new_squad],
+                                                     [self.team[i] for i in new_squad]):
+                continue
+            hits = max(len(outs) - free_transfers, 0) * HIT_COST
+            gain = self.gw_value(t, new_squad) - hits
+            if gain + self.ceiling[t + 1] <= best_value:
+                continue
+            new_free = min(max(free_transfers - len(outs), 0) + 1, MAX_FREE_TRANSFERS)
+            value, plan = self.search(t + 1, new_squad, new_free, new_bank, width)
+            if gain + value > best_value:
+                best_value = gain + value
+                best_plan = [{'gw_index': t, 'out': list(outs), 'in': list(ins), 'hits': hits}] + plan
+        self.memo[key] = (best_value, best_plan)
+        return self.memo[key]
+
+    def plan(self, squad, bank, free_transfers, time_limit=10.0, max_width=10):
+        """ Best plan found within the time limit, widening the search while time allows
+
+        Args:
+            squad (list): Element ids of the current squad
+            bank (int): Money in the bank, in tenths of a million
+            free_transfers (int): Free transfers available for the first gameweek
+            time_limit (float): Seconds to search for
+            max_width (int): Most replacements per position to consider
+
+        Returns None when not even the narrowest search finishes within the time limit.
+        """
+        start = time.time()
+        self.deadline = start + time_limit
+        squad = tuple(sorted(squad))
+        # the exact ceiling takes about a second per gameweek, leave the search at least half the time
+        self.set_ceiling(sum(self.cost[i] for i in squad) + bank, start + time_limit / 2)
+        best = None
+        for width in range(1, max_width + 1):
+            self.memo = {}
+            try:
+                value, plan = self.search(0, squad, free_transfers, bank, width)
+            except OutOfTime:
+                break
+            best = {'value': value, 'plan': plan, 'width': width}
+        return best
+
+
+def plan_transfers(squad, bank, free_transfers, players, projections, horizon=3, time_limit=10.0,
+                   max_transfers=2):
+    """ Best transfer plan over the next `horizon` gameweeks
+
+    Args:
+        squad (list): Element ids of the current squad
+        bank (int): Money in the bank, in tenths of a million
+        free_transfers (int): Free transfers available for the first gameweek
+        players: df of players as returned by optimizer.load_players
+        projections: df of projected points indexed by element, one column per gameweek
+        horizon (int): Number of gameweeks to plan for
+        time_limit (float): Seconds to search for
+        max_transfers (int): Most transfers to make in a gameweek
+
+    Returns None when no plan is found within the time limit.
+    """
+    planner = TransferPlanner(players, projections, horizon, max_transfers)
+    return planner.plan(squad, bank, free_transfers, time_limit)
+
+
+def synthetic_projections(players, num_gws, seed=0):
+    """ Projections that vary around ep_next per gameweek, for benchmarking
+    """
+    rng = np.random.RandomState(seed)
+    base = players.set_index('id')['points'].to_numpy()
+    noise = rng.gamma(4.0, 0.25, size=(len(base), num_gws))
+    return pd.DataFrame(base[:, None] * noise, index=players['id'], columns=range(1, num_gws + 1))
+
+
+def benchmark_horizons(base_filename='data/2024-25/', horizons=range(1, 6), width=3):
+    """ Print how the search time grows with the horizon at a fixed width
+    """
+    players = load_players(base_filename)
+    squad = optimize_squad(players, 980)['id'].tolist()
+    projections = synthetic_projections(players, max(horizons))
+    for horizon in horizons:
+        planner = TransferPlanner(players, projections, horizon)
+        planner.set_ceiling(sum(planner.cost[i] for i in squad) + 20)
+        planner.deadline = float('inf')
+        planner.memo = {}
+        start = time.time()
+        value, _ = planner.search(0, tuple(sorted(squad)), 1, 20, width)
+        print("horizon " + str(horizon) + ": " + str(round(time.time() - start, 3)) + "s, "
+              + str(len(planner.memo)) + " states, value " + str(round(value, 2)))
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        benchmark_horizons()
+        return
+    if len(sys.argv) < 6:
+        print("Usage: python transfer_planner.py <picks_csv> <projections_csv> <bank> <free_transfers> <horizon> [season_folder]. Eg: python transfer_planner.py team_5000_data24_25/picks_3.csv projections.csv 5 1 4")
+        print("       python transfer_planner.py --benchmark")
+        sys.exit(1)
+    base_filename = 'data/2024-25/'
+    if len(sys.argv) > 6:
+        base_filename = sys.argv[6]
+    players = load_players(base_filename)
+    names = players.set_index('id')['web_name'].to_dict()
+    projections = load_projections(sys.argv[2])
+    result = plan_transfers(load_squad(sys.argv[1]), int(sys.argv[3]), int(sys.argv[4]),
+                            players, projections, int(sys.argv[5]))
+    if result is None:
+        print("No plan found within the time limit")
+        sys.exit(1)
+    gws = list(projections.columns)
+    for step in result['plan']:
+        moves = ', '.join(names[o] + ' -> ' + names[i] for o, i in zip(step['out'], step['in']))
+        print("GW" + str(gws[step['gw_index']]) + ": " + (moves or 'no transfers') + (" (-" + str(step['hits']) + ")" if step['hits'] else ''))
+    print("Projected points: " + str(round(result['value'], 2)))
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,8 @@ import codecs
 import pandas as pd
 import os
 import csv
+from season_loader import detect_encoding
+from shot_store import append_shots, build_indexes
 
 def get_data(url):
     response = requests.get(url)
@@ -73,11 +75,98 @@ def parse_epl_data(outfile_base):
     player_frame = pd.DataFrame.from_records(playerData)
     player_frame.to_csv(os.path.join(outfile_base, 'understat_player.csv'), index=False)
     for d in playerData:
-        matches, shots, groups = get_player_data(int(d['id']))
-        indi_player_frame = pd.DataFrame.from_records(matches)
-        player_name = d['player_name']
-        player_name = player_name.replace(' ', '_')
-        indi_player_frame.to_csv(os.path.join(outfile_base, player_name + '_' + d['id'] + '.csv'), index=False)
+        write_player_matches(d, outfile_base)
+    build_indexes(os.path.join(outfile_base, 'shots'))
+
+def get_season(outfile_base):
+    """ Name of the season folder an understat folder is in, e.g. '2024-25'
+    """
+    return os.path.basename(os.path.dirname(os.path.normpath(outfile_base)))
+
+def write_player_matches(d, outfile_base):
+    matches, shots, groups = get_player_data(int(d['id']))
+    indi_player_frame = pd.DataFrame.from_records(matches)
+    indi_player_frame.to_csv(os.path.join(outfile_base, get_player_filename(d)), index=False)
+    # a player's page has the shots of his whole career
+    season = get_season(outfile_base)[:4]
+    append_shots([s for s in shots if str(s['season']) == season], os.path.join(outfile_base, 'shots'))
+
+def get_player_filename(d):
+    player_name = d['player_name']
+    player_name = player_name.replace(' ', '_')
+    return player_name + '_' + d['id'] + '.csv'
+
+# Season totals in playersData that change whenever a player's match list does
+DELTA_COLUMNS = ['games', 'time', 'goals', 'xG', 'assists', 'xA', 'shots', 'key_passes',
+                 'npg', 'npxG', 'xGChain', 'xGBuildup']
+
+def get_signature(d):
+    """ Season totals of a playersData row, rounded so saved and fetched values compare equal
+    """
+    return [round(float(d[c]), 6) if d.get(c, '') != '' else None for c in DELTA_COLUMNS]
+
+def load_refresh_state(outfile_base):
+    """ Gets the totals each player's match file was last written with, as a dict of id -> signature
+
+    Without a state file, the totals in the saved understat_player.csv stand in
+    for the players whose match file exists.
+    """
+    state_path = os.path.join(outfile_base, 'understat_state.json')
+    if os.path.exists(state_path):
+        with open(state_path, 'r') as fin:
+            return json.load(fin)
+    state = {}
+    player_path = os.path.join(outfile_base, 'understat_player.csv')
+    if os.path.exists(player_path):
+        with open(player_path, 'r', encoding='utf-8') as fin:
+            for row in csv.DictReader(fin):
+                if os.path.exists(os.path.join(outfile_base, get_player_filename(row))):
+                    state[row['id']] = get_signature(row)
+    return state
+
+def save_refresh_state(state, outfile_base):
+    state_path = os.path.join(outfile_base, 'understat_state.json')
+    with open(state_path + '.tmp', 'w') as outf:
+        json.dump(state, outf)
+    os.replace(state_path + '.tmp', state_path)
+
+def write_if_changed(frame, path):
+    content = frame.to_csv(index=False)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8', newline='') as fin:
+            if fin.read() == content:
+                return False
+    with open(path, 'w', encoding='utf-8', newline='') as outf:
+        outf.write(content)
+    return True
+
+def refresh_epl_data(outfile_base):
+    """ Incremental parse_epl_data: refetch only the players whose season totals changed
+
+    The league page is fetched once; a player's page is only fetched when his
+    playersData totals differ from those his match file was written with. The
+    state is saved after every player, so an interrupted refresh resumes where
+    it stopped.
+
+    Args:
+        outfile_base (str): Understat folder of the season, e.g. 'data/2024-25/understat'
+    """
+    teamData, playerData = get_epl_data()
+    for t, v in teamData.items():
+        team = v["title"].replace(' ', '_')
+        write_if_changed(pd.DataFrame.from_records(v["history"]),
+                         os.path.join(outfile_base, 'understat_' + team + '.csv'))
+    state = load_refresh_state(outfile_base)
+    changed = [d for d in playerData if state.get(d['id']) != get_signature(d)]
+    print("Refetching " + str(len(changed)) + " of " + str(len(playerData)) + " players")
+    for d in changed:
+        write_player_matches(d, outfile_base)
+        state[d['id']] = get_signature(d)
+        save_refresh_state(state, outfile_base)
+    write_if_changed(pd.DataFrame.from_records(playerData), os.path.join(outfile_base, 'understat_player.csv'))
+    save_refresh_state(state, outfile_base)
+    build_indexes(os.path.join(outfile_base, 'shots'))
+    return changed
 
 class PlayerID:
     def __init__(self, us_id, fpl_id, us_name, fpl_name):
@@ -87,14 +176,18 @@ class PlayerID:
         self.fpl_name = fpl_name
         
 
-def match_ids(understat_dir, data_dir):
-    with open(os.path.join(understat_dir, 'understat_player.csv')) as understat_file:
+def get_player_ids(understat_dir, data_dir):
+    """ Pair understat and FPL players by name, unmatched players get an id of -1
+    """
+    understat_path = os.path.join(understat_dir, 'understat_player.csv')
+    with open(understat_path, encoding=detect_encoding(understat_path)) as understat_file:
         understat_inf = csv.DictReader(understat_file)
         ustat_players = {}
         for row in understat_inf:
             ustat_players[row['player_name']] = row['id']
 
-    with open(os.path.join(data_dir, 'player_idlist.csv')) as fpl_file:
+    fpl_path = os.path.join(data_dir, 'player_idlist.csv')
+    with open(fpl_path, encoding=detect_encoding(fpl_path)) as fpl_file:
         fpl_players = {}
         fpl_inf = csv.DictReader(fpl_file)
         for row in fpl_inf:
@@ -114,7 +207,10 @@ def match_ids(understat_dir, data_dir):
         if k not in found:
             player = PlayerID(-1, v, "", k)
             players += [player]
+    return players
 
+def match_ids(understat_dir, data_dir):
+    players = get_player_ids(understat_dir, data_dir)
     with open(os.path.join(data_dir, 'id_dict.csv'), 'w+') as outf:
         outf.write('Understat_ID, FPL_ID, Understat_Name, FPL_Name\n')
         for p in players:
@@ -0,0 +1,146 @@
+import sys
+import numpy as np
+import pandas as pd
+from season_loader import SEASON_SCHEMAS, load_season
+
+ROW_COLUMNS = ['GW', 'element', 'position', 'value', 'xP', 'total_points', 'minutes']
+# Upper edges of the xP bins of the calibration curve, the last bin is open
+XP_EDGES = [0.5, 1, 1.5, 2, 2.5, 3, 4, 5, 6, 7, 8]
+# Upper edges of the price bands, in millions, the last band is open
+PRICE_EDGES = [4.5, 5.5, 6.5, 8, 10]
+
+
+def get_labels(edges, fmt='{:g}'):
+    bounds = [None] + edges + [None]
+    labels = []
+    for low, high in zip(bounds[:-1], bounds[1:]):
+        if low is None:
+            labels += ['<' + fmt.format(high)]
+        elif high is None:
+            labels += [fmt.format(low) + '+']
+        else:
+            labels += [fmt.format(low) + '-' + fmt.format(high)]
+    return labels
+
+
+def load_projections(seasons=None, data_dir='data'):
+    """ xP and actual points of every player in every gameweek with projections
+
+    xP is a projection for the whole gameweek, so the points of a double
+    gameweek's fixtures are summed. Gameweeks whose xP file was missing when
+    they were collected have an xP of 0 for everyone and are left out.
+
+    Args:
+        seasons (list): Seasons to load, every season in the schema registry when None
+        data_dir (str): Folder containing the season folders
+    """
+    if seasons is None:
+        seasons = list(SEASON_SCHEMAS)
+    frames = []
+    for season in seasons:
+        df = load_season(season, ROW_COLUMNS, data_dir)
+        frames += [df.groupby(['season', 'GW', 'element'], as_index=False, sort=False).agg(
+            position=('position', 'first'), value=('value', 'first'), xP=('xP', 'first'),
+            points=('total_points', 'sum'), minutes=('minutes', 'sum'), fixtures=('total_points', 'size'))]
+    df = pd.concat(frames, ignore_index=True)
+    df['xP'] = df['xP'].astype('float64').fillna(0)
+    df['points'] = df['points'].astype('float64')
+    projected = (df['xP'] != 0).groupby([df['season'], df['GW']]).transform('any')
+    df = df[projected].reset_index(drop=True)
+    # 2024-25 onwards names goalkeepers GKP
+    df['position'] = df['position'].replace('GKP', 'GK')
+    df['played'] = df['minutes'].fillna(0) > 0
+    df['price'] = df['value'].astype('float64') / 10
+    df['price_band'] = pd.Categorical.from_codes(np.searchsorted(PRICE_EDGES, df['price'], side='right'),
+                                                 get_labels(PRICE_EDGES))
+    df['xp_bin'] = pd.Categorical.from_codes(np.searchsorted(XP_EDGES, df['xP'], side='right'),
+                                             get_labels(XP_EDGES))
+    df['error'] = df['points'] - df['xP']
+    return df
+
+
+def calibration_curve(df, by=None):
+    """ Mean projected and actual points of the players in every xP bin
+
+    A well calibrated projection has mean_points close to mean_xP in every bin.
+
+    Args:
+        df: df as returned by load_projections
+        by (list): Extra columns to split the curve by, e.g. ['season']
+    """
+    keys = (by or []) + ['xp_bin']
+    return df.groupby(keys, observed=True).agg(
+        players=('xP', 'size'), mean_xP=('xP', 'mean'), mean_points=('points', 'mean'),
+        played=('played', 'mean')).reset_index()
+
+
+def bias_by(df, column):
+    """ Mean error (points - xP), mean absolute error and RMSE grouped by a column
+
+    Args:
+        df: df as returned by load_projections
+        column (str): Column to group by, e.g. 'position' or 'price_band'
+    """
+    df = df.assign(abs_error=df['error'].abs(), sq_error=df['error'] ** 2)
+    summary = df.groupby(column, observed=True).agg(
+        players=('error', 'size'), mean_xP=('xP', 'mean'), mean_points=('points', 'mean'),
+        bias=('error', 'mean'), mae=('abs_error', 'mean'), mse=('sq_error', 'mean')).reset_index()
+    summary['rmse'] = np.sqrt(summary.pop('mse'))
+    return summary
+
+
+def rank_correlation(df):
+    """ Spearman correlation between xP and points within every gameweek
+
+    Both columns are ranked within each gameweek and the Pearson correlation
+    of the ranks is computed from grouped sums, without a loop over gameweeks.
+
+    Args:
+        df: df as returned by load_projections
+    """
+    keys = ['season', 'GW']
+    ranks = df.groupby(keys)[['xP', 'points']].rank()
+    r = pd.DataFrame({'season': df['season'], 'GW': df['GW'], 'x': ranks['xP'], 'y': ranks['points']})
+    r['xy'] = r['x'] * r['y']
+    r['xx'] = r['x'] ** 2
+    r['yy'] = r['y'] ** 2
+    sums = r.groupby(keys).agg(n=('x', 'size'), x=('x', 'sum'), y=('y', 'sum'), xy=('xy', 'sum'),
+                               xx=('xx', 'sum'), yy=('yy', 'sum'))
+    cov = sums['xy'] - sums['x'] * sums['y'] / sums['n']
+    var_x = sums['xx'] - sums['x'] ** 2 / sums['n']
+    var_y = sums['yy'] - sums['y'] ** 2 / sums['n']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        spearman = cov / np.sqrt(var_x * var_y)
+    return pd.DataFrame({'players': sums['n'], 'spearman': spearman}).reset_index()
+
+
+def backtest(seasons=None, data_dir='data'):
+    """ Every report of the backtest as a dict of name -> df
+
+    Args:
+        seasons (list): Seasons to include, every season in the schema registry when None
+        data_dir (str): Folder containing the season folders
+    """
+    df = load_projections(seasons, data_dir)
+    correlation = rank_correlation(df)
+    by_season = bias_by(df, 'season').merge(
+        correlation.groupby('season', as_index=False)['spearman'].mean(), on='season')
+    return {
+        'season': by_season,
+        'calibration': calibration_curve(df),
+        'position': bias_by(df, 'position'),
+        'price_band': bias_by(df, 'price_band'),
+        'gameweek': correlation,
+    }
+
+
+def main():
+    seasons = sys.argv[1:] or None
+    reports = backtest(seasons)
+    for name in ['season', 'calibration', 'position', 'price_band']:
+        print(name)
+        print(reports[name].round(3).to_string(index=False))
+        print()
+
+if __name__ == '__main__':
+    main()